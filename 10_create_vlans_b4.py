@@ -1,5 +1,7 @@
 # 10_create_vlans_b4.py
 import b4_cfg as cfg
+import b4_plan as plan
+import b4_rollback as rb
 from b4_netmiko import B4
 
 # =========================
@@ -8,24 +10,24 @@ from b4_netmiko import B4
 # Создаём диапазон VLAN и привязываем их к VLAN bridge.
 # Диапазон берём из cfg: VLAN_START ... VLAN_START+VLAN_COUNT-1
 
-vlan_ids = [cfg.VLAN_START + i for i in range(cfg.VLAN_COUNT)]
+vlan_ids = plan.vlan_ids()
+
+r = B4.from_cfg(cfg, tag="10_create_vlans").open()
 
 # 1) включаем bridge в vlan режим
 # 2) переходим в vlan database
 # 3) создаём VLAN и цепляем к bridge
-cmds = (
-    [f"bridge {cfg.BRIDGE_ID} protocol {cfg.BRIDGE_PROTOCOL} vlan-bridge", "vlan database"]
-    + [f"vlan {vid} bridge {cfg.BRIDGE_ID} state enable" for vid in vlan_ids]
-    + ["exit"]
-)
+# Если устройство понимает диапазоны (кэш фактов, b4_facts) —
+# весь диапазон создаётся одной командой вместо VLAN_COUNT строк.
+cmds = plan.vlans_cmds(use_range=r.supports("range"))
 
-r = B4(
-    cfg.HOST, cfg.USER, cfg.PASSWORD, cfg.DEVICE_TYPE, cfg.PORT,
-    global_delay=cfg.GLOBAL_DELAY_FACTOR, out_dir=cfg.OUT_DIR, tag="10_create_vlans"
-).open()
+# Состояние до изменений (только нужные секции) — из него считаем команды отката
+pre = r.snapshot(plan.snapshot_cmds("10"), read_timeout=cfg.READ_TIMEOUT)
 
 # Льём конфиг пакетами, чтобы устройство не захлебнулось на больших объёмах
 r.cfg(cmds, per_batch=cfg.CFG_PER_BATCH, read_timeout=cfg.READ_TIMEOUT, sleep_between=cfg.CFG_SLEEP)
+if pre is not None:
+    r.journal(r.applied, rb.inverse_vlans(pre, vlan_ids, cfg.BRIDGE_ID))
 
 # Контрольная точка: должны увидеть созданный диапазон
 r.save_text("show_vlan_brief", r.show("show vlan brief", read_timeout=cfg.READ_TIMEOUT))
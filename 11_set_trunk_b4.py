@@ -1,5 +1,7 @@
 # 11_set_trunk_b4.py
 import b4_cfg as cfg
+import b4_plan as plan
+import b4_rollback as rb
 from b4_netmiko import B4
 
 # =========================
@@ -14,20 +16,16 @@ from b4_netmiko import B4
 first = cfg.VLAN_START
 last = cfg.VLAN_START + cfg.VLAN_COUNT - 1
 
-cmds = [
-    f"interface {cfg.TRUNK_IF}",
-    "switchport",
-    f"bridge-group {cfg.BRIDGE_ID}",
-    "switchport mode trunk",
-    f"switchport trunk allowed vlan add {first}-{last}",
-]
+cmds = plan.trunk_cmds()
 
-r = B4(
-    cfg.HOST, cfg.USER, cfg.PASSWORD, cfg.DEVICE_TYPE, cfg.PORT,
-    global_delay=cfg.GLOBAL_DELAY_FACTOR, out_dir=cfg.OUT_DIR, tag="11_set_trunk"
-).open()
+r = B4.from_cfg(cfg, tag="11_set_trunk").open()
+
+# Состояние до изменений (только нужные секции) — из него считаем команды отката
+pre = r.snapshot(plan.snapshot_cmds("11"), read_timeout=cfg.READ_TIMEOUT)
 
 r.cfg(cmds, per_batch=cfg.CFG_PER_BATCH, read_timeout=cfg.READ_TIMEOUT, sleep_between=cfg.CFG_SLEEP)
+if pre is not None:
+    r.journal(r.applied, rb.inverse_trunk(pre, cfg.TRUNK_IF, cfg.BRIDGE_ID, range(first, last + 1)))
 
 # Снимаем состояние порта после настройки
 r.save_text(
@@ -1,5 +1,7 @@
 # 20_create_svis_b4.py
 import b4_cfg as cfg
+import b4_plan as plan
+import b4_rollback as rb
 from b4_netmiko import B4
 
 # =========================
@@ -9,25 +11,17 @@ from b4_netmiko import B4
 # Здесь только поднимаем интерфейс.
 # IP и VRF вяжутся отдельным шагом (31-й скрипт).
 
-def svi_name(vid: int) -> str:
-    return f"vlan1.{vid}"
+vlan_ids = plan.vlan_ids(cfg.SVI_COUNT)
+cmds = plan.svis_cmds()
 
-vlan_ids = [cfg.VLAN_START + i for i in range(cfg.SVI_COUNT)]
+r = B4.from_cfg(cfg, tag="20_create_svis").open()
 
-cmds = []
-for vid in vlan_ids:
-    cmds += [
-        f"interface {svi_name(vid)}",
-        "no shutdown",
-        "exit",
-    ]
-
-r = B4(
-    cfg.HOST, cfg.USER, cfg.PASSWORD, cfg.DEVICE_TYPE, cfg.PORT,
-    global_delay=cfg.GLOBAL_DELAY_FACTOR, out_dir=cfg.OUT_DIR, tag="20_create_svis"
-).open()
+# Состояние до изменений (только нужные секции) — из него считаем команды отката
+pre = r.snapshot(plan.snapshot_cmds("20"), read_timeout=cfg.READ_TIMEOUT)
 
 r.cfg(cmds, per_batch=cfg.CFG_PER_BATCH, read_timeout=cfg.READ_TIMEOUT, sleep_between=cfg.CFG_SLEEP)
+if pre is not None:
+    r.journal(r.applied, rb.inverse_svis(pre, [plan.svi_name(v) for v in vlan_ids]))
 
 # Проверка: SVI должны появиться в "show ip interface brief"
 r.save_text("show_ip_int_brief", r.show("show ip interface brief", read_timeout=cfg.READ_TIMEOUT))
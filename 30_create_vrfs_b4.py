@@ -1,5 +1,7 @@
 # 30_create_vrfs_b4.py
 import b4_cfg as cfg
+import b4_plan as plan
+import b4_rollback as rb
 from b4_netmiko import B4
 
 # =========================
@@ -8,15 +10,17 @@ from b4_netmiko import B4
 # Создаём набор VRF по схеме 1:1 с первыми VRF_COUNT VLAN.
 # Имя VRF строится как "<VRF_PREFIX><VID>".
 
-vrfs = [f"{cfg.VRF_PREFIX}{cfg.VLAN_START + i}" for i in range(cfg.VRF_COUNT)]
-cmds = [f"ip vrf {v}" for v in vrfs]
+vrfs = plan.vrfs()
+cmds = plan.vrfs_cmds()
 
-r = B4(
-    cfg.HOST, cfg.USER, cfg.PASSWORD, cfg.DEVICE_TYPE, cfg.PORT,
-    global_delay=cfg.GLOBAL_DELAY_FACTOR, out_dir=cfg.OUT_DIR, tag="30_create_vrfs"
-).open()
+r = B4.from_cfg(cfg, tag="30_create_vrfs").open()
+
+# Состояние до изменений (только нужные секции) — из него считаем команды отката
+pre = r.snapshot(plan.snapshot_cmds("30"), read_timeout=cfg.READ_TIMEOUT)
 
 r.cfg(cmds, per_batch=cfg.CFG_PER_BATCH, read_timeout=cfg.READ_TIMEOUT, sleep_between=cfg.CFG_SLEEP)
+if pre is not None:
+    r.journal(r.applied, rb.inverse_vrfs(pre, vrfs))
 
 # Проверяем, что VRF реально создались
 r.save_text("show_run_vrf", r.show("show running-config vrf", read_timeout=cfg.READ_TIMEOUT))
@@ -1,5 +1,7 @@
 # 31_bind_svis_to_vrf_b4.py
 import b4_cfg as cfg
+import b4_plan as plan
+import b4_rollback as rb
 from b4_netmiko import B4
 
 # =========================
@@ -11,34 +13,16 @@ from b4_netmiko import B4
 # Важно: порядок "ip vrf forwarding" -> "ip address".
 # Если сначала IP, потом VRF — IP слетит.
 
-def ip_for_idx(idx: int) -> str:
-    a = cfg.IP_BASE_A
-    b = cfg.IP_BASE_B_START + (idx // cfg.NET_SIZE)
-    c = cfg.IP_BASE_C_START + (idx % cfg.NET_SIZE)
-    return f"{a}.{b}.{c}.1/24"
+cmds = plan.bind_cmds()
 
-def svi_name(vid: int) -> str:
-    return f"vlan1.{vid}"
+r = B4.from_cfg(cfg, tag="31_bind_svis_to_vrfs").open()
 
-vlan_ids = [cfg.VLAN_START + i for i in range(cfg.VRF_COUNT)]
-vrfs = [f"{cfg.VRF_PREFIX}{vid}" for vid in vlan_ids]
-
-cmds = []
-for i, vid in enumerate(vlan_ids):
-    cmds += [
-        f"interface {svi_name(vid)}",
-        f"ip vrf forwarding {vrfs[i]}",
-        f"ip address {ip_for_idx(i)}",
-        "no shutdown",
-        "exit",
-    ]
-
-r = B4(
-    cfg.HOST, cfg.USER, cfg.PASSWORD, cfg.DEVICE_TYPE, cfg.PORT,
-    global_delay=cfg.GLOBAL_DELAY_FACTOR, out_dir=cfg.OUT_DIR, tag="31_bind_svis_to_vrfs"
-).open()
+# Состояние до изменений (только нужные секции) — из него считаем команды отката
+pre = r.snapshot(plan.snapshot_cmds("31"), read_timeout=cfg.READ_TIMEOUT)
 
 r.cfg(cmds, per_batch=cfg.CFG_PER_BATCH, read_timeout=cfg.READ_TIMEOUT, sleep_between=cfg.CFG_SLEEP)
+if pre is not None:
+    r.journal(r.applied, rb.inverse_bind(pre, plan.binds()))
 
 # Контроль: IP должны появиться на SVI
 r.save_text("show_ip_int_brief", r.show("show ip interface brief", read_timeout=cfg.READ_TIMEOUT))
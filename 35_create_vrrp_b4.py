@@ -2,6 +2,8 @@
 import re
 from pathlib import Path
 import b4_cfg as cfg
+import b4_plan as plan
+import b4_rollback as rb
 from b4_netmiko import B4
 
 # =========================
@@ -14,26 +16,17 @@ from b4_netmiko import B4
 
 IP_RE = re.compile(r"^\s*ip address\s+(\d+\.\d+\.\d+\.\d+)(?:/\d+)?", re.I | re.M)
 
-def ifn(vid: int) -> str:
-    return f"vlan1.{vid}"
+r = B4.from_cfg(cfg, tag="35_create_vrrp").open()
 
-vlan_ids = [cfg.VLAN_START + i for i in range(min(cfg.VRRP_COUNT, cfg.SVI_COUNT))]
-start_id = cfg.VRRP_START_ID
-priority = cfg.VRRP_PRIORITY
+# Состояние до изменений (только нужные секции) — из него считаем команды отката
+pre = r.snapshot(plan.snapshot_cmds("35"), read_timeout=cfg.READ_TIMEOUT)
 
-r = B4(
-    cfg.HOST, cfg.USER, cfg.PASSWORD, cfg.DEVICE_TYPE, cfg.PORT,
-    global_delay=cfg.GLOBAL_DELAY_FACTOR, out_dir=cfg.OUT_DIR, tag="35_create_vrrp"
-).open()
-
-plan = []
-cmds = []
+lines = []
+vips = {}
 miss = []
+groups = []
 
-for idx, vid in enumerate(vlan_ids):
-    ifname = ifn(vid)
-    vrid = start_id + idx
-
+for vrid, ifname in plan.vrrp_targets():
     # Смотрим конфиг интерфейса и вытаскиваем IP
     rc = r.show(f"show running-config interface {ifname}", read_timeout=cfg.READ_TIMEOUT)
     m = IP_RE.search(rc)
@@ -42,23 +35,19 @@ for idx, vid in enumerate(vlan_ids):
         miss.append(f"{ifname} (VRID {vrid})")
         continue
 
-    vip = m.group(1)
-    plan.append(f"VRID {vrid} -> {ifname} VIP {vip}")
+    vips[ifname] = m.group(1)
+    lines.append(f"VRID {vrid} -> {ifname} VIP {vips[ifname]}")
+    groups.append((vrid, ifname))
 
-    cmds += [
-        f"router vrrp {vrid} {ifname}",
-        f"virtual-ip {vip}",
-        f"priority {priority}",
-        "v2-compatible",
-        "enable",
-        "exit",
-    ]
+cmds = plan.vrrp_cmds(vips)
 
 # План и фактическая заливка
-if plan:
-    r.save_text("vrrp_plan", "\n".join(plan))
+if lines:
+    r.save_text("vrrp_plan", "\n".join(lines))
 if cmds:
     r.cfg(cmds, per_batch=cfg.CFG_PER_BATCH, read_timeout=cfg.READ_TIMEOUT, sleep_between=cfg.CFG_SLEEP)
+    if pre is not None:
+        r.journal(r.applied, rb.inverse_vrrp(pre, groups))
 
 # Что пропустили — фиксируем в errors.log
 if miss:
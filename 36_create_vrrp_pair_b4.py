@@ -0,0 +1,138 @@
+# 36_create_vrrp_pair_b4.py
+import argparse
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+
+import b4_cfg as cfg
+import b4_drift as drift
+import b4_plan as plan
+import b4_rollback as rb
+from b4_netmiko import B4, ts
+from b4_runcfg import parse_blocks
+
+# =========================
+# Идея скрипта
+# =========================
+# Настраиваем HA-пару (два коммутатора с одними VLAN/SVI/VRF) одновременно:
+# - реальные IP на SVI разные: .PAIR_HOST_OCTETS[0] у первого, .PAIR_HOST_OCTETS[1] у второго
+# - VIP общий: .VIP_LAST_OCTET в той же /24
+# - первый — мастер (VRRP_PRIORITY), второй — backup (VRRP_BACKUP_PRIORITY);
+#   при VRRP_ALTERNATE мастер чередуется по группам, чтобы оба коммутатора несли трафик
+#
+# Шаги те же, что у одиночного прогона (10 → 11 → 20 → 30 → 31 → 35 → 50),
+# и идут в ногу: шаг льётся на оба хоста параллельно, следующий начинается,
+# только когда оба закончили. Пара настраивается примерно за время одного коммутатора,
+# и ни один из них не уходит вперёд, пока второй недонастроен.
+#
+# python 36_create_vrrp_pair_b4.py                          — хосты из PAIR_HOSTS
+# python 36_create_vrrp_pair_b4.py --hosts 10.0.0.1 10.0.0.2
+# python 36_create_vrrp_pair_b4.py --steps 31 35            — VLAN/SVI/VRF уже есть
+
+STEPS = ["10", "11", "20", "30", "31", "35", "50"]
+
+ap = argparse.ArgumentParser(description="Одновременная настройка VRRP HA-пары")
+ap.add_argument("--hosts", nargs=2, default=cfg.PAIR_HOSTS or None, help="два хоста пары")
+ap.add_argument("--steps", nargs="+", choices=STEPS, default=STEPS, help="какие шаги (по умолчанию все)")
+args = ap.parse_args()
+
+if not args.hosts or len(args.hosts) != 2:
+    sys.exit("Нужны два хоста: PAIR_HOSTS в cfg или --hosts A B")
+octets = list(cfg.PAIR_HOST_OCTETS)
+if len(set(octets + [cfg.VIP_LAST_OCTET])) != 3:
+    sys.exit(f"PAIR_HOST_OCTETS {octets} и VIP_LAST_OCTET {cfg.VIP_LAST_OCTET} должны различаться")
+
+first, last = cfg.VLAN_START, cfg.VLAN_START + cfg.VLAN_COUNT - 1
+vips = plan.pair_vips()
+
+
+def step_cmds(step: str, peer: int, r: B4):
+    # (команды, функция обратных команд от состояния "до") шага для одного хоста пары
+    if step == "10":
+        vids = plan.vlan_ids()
+        return plan.vlans_cmds(use_range=r.supports("range")), lambda pre: rb.inverse_vlans(pre, vids, cfg.BRIDGE_ID)
+    if step == "11":
+        vids = range(first, last + 1)
+        return plan.trunk_cmds(), lambda pre: rb.inverse_trunk(pre, cfg.TRUNK_IF, cfg.BRIDGE_ID, vids)
+    if step == "20":
+        names = [plan.svi_name(v) for v in plan.vlan_ids(cfg.SVI_COUNT)]
+        return plan.svis_cmds(), lambda pre: rb.inverse_svis(pre, names)
+    if step == "30":
+        return plan.vrfs_cmds(), lambda pre: rb.inverse_vrfs(pre, plan.vrfs())
+    if step == "31":
+        host = octets[peer]
+        return plan.bind_cmds(host), lambda pre: rb.inverse_bind(pre, plan.binds(host))
+    if step == "35":
+        groups = [(vrid, ifname) for vrid, ifname in plan.vrrp_targets() if ifname in vips]
+        cmds = plan.vrrp_cmds(vips, priorities=plan.pair_priorities(peer))
+        return cmds, lambda pre: rb.inverse_vrrp(pre, groups)
+    if step == "50":
+        cmds = plan.ospf_cmds() if cfg.OSPF_ENABLE else []
+        return cmds, lambda pre: rb.inverse_ospf(pre, plan.ospf_procs())
+    raise SystemExit(f"Неизвестный шаг {step}")
+
+
+def push(step: str, peer: int, r: B4, pre):
+    t0 = time.time()
+    cmds, inverse = step_cmds(step, peer, r)
+    failed = []
+    if cmds:
+        failed = r.cfg(cmds, per_batch=cfg.CFG_PER_BATCH, read_timeout=cfg.READ_TIMEOUT, sleep_between=cfg.CFG_SLEEP)
+        if pre is not None:
+            r.journal(r.applied, inverse(pre))
+    return time.time() - t0, len(cmds), failed
+
+
+def open_peer(host: str):
+    # Сессия и состояние до изменений (один снимок секций всех шагов на весь прогон —
+    # из него считаются все откаты)
+    r = B4.from_cfg(cfg, tag=f"36_vrrp_pair_{host}", host=host).open()
+    return r, r.snapshot(plan.snapshot_cmds(*args.steps), read_timeout=cfg.READ_TIMEOUT)
+
+
+def in_step(pool, fn, *per_peer):
+    # Запускаем fn на обоих хостах и ждём обоих, даже если один упал:
+    # сессию, занятую вторым потоком, трогать нельзя
+    futs = [pool.submit(fn, *a) for a in zip(*per_peer)]
+    wait(futs)
+    return futs
+
+
+# Один run_id на оба хоста — откат: B4_HOST=<хост> python 95_rollback_b4.py <run_id>
+cfg.RUN_ID = cfg.RUN_ID or f"{ts()}_vrrp_pair"
+print(f"run_id: {cfg.RUN_ID}")
+
+rc = 0
+with ThreadPoolExecutor(max_workers=2) as pool:
+    futs = in_step(pool, open_peer, args.hosts)
+    opened = [f.result() for f in futs if not f.exception()]
+    if len(opened) != 2:
+        for r, _ in opened:
+            r.close()
+        raise next(f.exception() for f in futs if f.exception())
+    peers = [r for r, _ in opened]
+    pres = [pre for _, pre in opened]
+
+    try:
+        for step in args.steps:
+            futs = in_step(pool, push, [step, step], [0, 1], peers, pres)
+            res = [f.result() for f in futs]
+            print(f"step {step}: " + ", ".join(
+                f"{r.params['host']} {n} cmds {dt:.1f}s" + (f" ({len(bad)} failed)" if bad else "")
+                for r, (dt, n, bad) in zip(peers, res)
+            ))
+            if any(bad for _, _, bad in res):
+                rc = 1
+        if rc == 0:
+            # Пара настроена без ошибок — это baseline для проверки дрейфа (70_drift_check_b4.py)
+            futs = in_step(pool, lambda r: r.show("show running-config", read_timeout=cfg.READ_TIMEOUT), peers)
+            for r, f in zip(peers, futs):
+                secs = drift.sections(parse_blocks(f.result()), cfg.TRUNK_IF)
+                drift.save_baseline(cfg.OUT_DIR, r.params["host"], secs, run_id=cfg.RUN_ID)
+    finally:
+        for r in peers:
+            r.save_text("show_vrrp", r.show("show vrrp summary", read_timeout=cfg.READ_TIMEOUT))
+            r.close()
+
+print("FAIL" if rc else "OK")
+sys.exit(rc)
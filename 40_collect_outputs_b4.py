@@ -1,24 +1,28 @@
 # 40_collect_outputs_b4.py
 import b4_cfg as cfg
+import b4_drift as drift
 from b4_netmiko import B4
+from b4_runcfg import parse_blocks
 
 # =========================
 # Идея скрипта
 # =========================
 # Сбор диагностических show после всех шагов.
 # Здесь нет конфигурации — только фиксация состояния устройства.
+# В составе run_all (шаг идёт последним и только если все шаги прошли)
+# running-config становится baseline для проверки дрейфа (70_drift_check_b4.py).
 
-r = B4(
-    cfg.HOST, cfg.USER, cfg.PASSWORD, cfg.DEVICE_TYPE, cfg.PORT,
-    global_delay=cfg.GLOBAL_DELAY_FACTOR, out_dir=cfg.OUT_DIR, tag="40_collect"
-).open()
+r = B4.from_cfg(cfg, tag="40_collect").open()
 
 r.save_text("show_version", r.show("show version", read_timeout=cfg.READ_TIMEOUT))
 r.save_text("show_vlan_brief", r.show("show vlan brief", read_timeout=cfg.READ_TIMEOUT))
 r.save_text("show_ip_int_brief", r.show("show ip interface brief", read_timeout=cfg.READ_TIMEOUT))
 r.save_text("show_run_trunk", r.show(f"show running-config interface {cfg.TRUNK_IF}", read_timeout=cfg.READ_TIMEOUT))
 r.save_text("show_run_vrf", r.show("show running-config vrf", read_timeout=cfg.READ_TIMEOUT))
-r.save_text("show_running", r.show("show running-config", read_timeout=cfg.READ_TIMEOUT))
+running = r.show("show running-config", read_timeout=cfg.READ_TIMEOUT)
+r.save_text("show_running", running)
+if cfg.RUN_ID:
+    drift.save_baseline(cfg.OUT_DIR, cfg.HOST, drift.sections(parse_blocks(running), cfg.TRUNK_IF), run_id=cfg.RUN_ID)
 r.save_text("show_ip_ospf", r.show("show ip ospf interface brief", read_timeout=cfg.READ_TIMEOUT))
 r.save_text("show_ip_ospf_ro", r.show("show ip ospf route", read_timeout=cfg.READ_TIMEOUT))
 r.save_text("show_ip_VRF", r.show("show ip vrf", read_timeout=cfg.READ_TIMEOUT))
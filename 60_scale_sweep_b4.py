@@ -0,0 +1,227 @@
+# 60_scale_sweep_b4.py
+import argparse
+import csv
+import json
+import os
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import b4_cfg as cfg
+
+# =========================
+# Идея скрипта
+# =========================
+# Замер производительности по объёму конфигурации.
+# Для каждой точки SWEEP_GRID из cfg:
+# 1) прогоняем шаги create (10 → 11 → 20 → 30 → 31 → 35 → 50) и delete (90)
+#    с объёмами этой точки (через переменные окружения B4_<ИМЯ>)
+# 2) меряем время шага и считаем команды по его commands.log
+# 3) складываем результаты в out_b4/sweep/<stamp>_sweep.csv/.json
+# Дальше сравниваем с сохранённым baseline и ищем точку,
+# где время на одну сущность перестаёт расти линейно.
+# Время шага включает постоянную часть (старт интерпретатора, SSH, пробы),
+# поэтому линейность проверяем по приросту между соседними точками:
+# Δсекунд / Δсущностей — постоянная часть в разнице сокращается.
+# Журнал отката в замере выключен: его снимок секций до заливки растёт с N
+# и попадал бы во время шага. Каждая точка заканчивается 90_delete_all,
+# который сносит всё, что создали шаги (включая VRRP и OSPF), — следующая
+# точка стартует с чистого устройства.
+#
+# Цель — локальный симулятор или живое устройство: --host/--port/--device-type.
+
+# (скрипт, параметр cfg, который задаёт число сущностей шага)
+CREATE_STEPS = [
+    ("10_create_vlans_b4.py", "VLAN_COUNT"),
+    ("11_set_trunk_b4.py", "VLAN_COUNT"),
+    ("20_create_svis_b4.py", "SVI_COUNT"),
+    ("30_create_vrfs_b4.py", "VRF_COUNT"),
+    ("31_bind_svis_to_vrf_b4.py", "VRF_COUNT"),
+    ("35_create_vrrp_b4.py", "VRRP_COUNT"),
+    ("50_create_ospf_b4.py", "VRF_COUNT"),
+]
+DELETE_STEPS = [
+    ("90_delete_all_b4.py", "VLAN_COUNT"),
+]
+
+SWEEP_DIR = Path(cfg.OUT_DIR) / "sweep"
+BASELINE = SWEEP_DIR / "baseline.json"
+
+
+def point_key(point: dict) -> str:
+    return ",".join(f"{k}={point[k]}" for k in sorted(point))
+
+
+def entities(count_key: str, point: dict) -> int:
+    n = point.get(count_key, getattr(cfg, count_key))
+    # VRRP ограничен количеством SVI — так же, как в 35-м скрипте
+    if count_key == "VRRP_COUNT":
+        n = min(n, point.get("SVI_COUNT", cfg.SVI_COUNT))
+    return max(int(n), 1)
+
+
+def count_commands(run_dir: Path, started: float) -> int:
+    # Команды шага — непустые строки в commands.log, который шаг создал
+    # в своей папке после старта. "exit", которые дописывает нарезка на блоки
+    # (b4_chunks), командами конфигурации не считаем.
+    total = 0
+    for p in run_dir.glob("*_commands.log"):
+        if p.stat().st_mtime < started:
+            continue
+        with open(p, encoding="utf-8", errors="replace") as f:
+            total += sum(1 for line in f if line.strip() and line.strip() not in ("exit", "end"))
+    return total
+
+
+def run_step(script: str, env: dict, run_dir: Path) -> tuple[float, int, int]:
+    started = time.time()
+    t0 = time.perf_counter()
+    rc = subprocess.run([sys.executable, script], env=env).returncode
+    took = time.perf_counter() - t0
+    return took, count_commands(run_dir, started), rc
+
+
+def sweep(args) -> list[dict]:
+    stamp = time.strftime("%Y%m%d-%H%M%S")
+    rows = []
+    steps = CREATE_STEPS + ([] if args.no_delete else DELETE_STEPS)
+
+    for pi, point in enumerate(cfg.SWEEP_GRID):
+        # Каждая точка пишет логи в свою папку — так commands.log не смешиваются
+        run_dir = SWEEP_DIR / stamp / f"p{pi:02d}"
+        env = dict(os.environ)
+        env["B4_OUT_DIR"] = str(run_dir)
+        env["B4_ROLLBACK_JOURNAL"] = "0"
+        for k, v in point.items():
+            env[f"B4_{k}"] = str(v)
+        for k in ("host", "port", "device_type"):
+            v = getattr(args, k)
+            if v is not None:
+                env[f"B4_{k.upper()}"] = str(v)
+
+        for script, count_key in steps:
+            took, ncmd, rc = run_step(script, env, run_dir)
+            n = entities(count_key, point)
+            rows.append({
+                "stamp": stamp,
+                "point": point_key(point),
+                "step": script,
+                "entities": n,
+                "seconds": round(took, 3),
+                "commands": ncmd,
+                "cmd_per_sec": round(ncmd / took, 2) if took > 0 else 0.0,
+                "sec_per_entity": round(took / n, 5),
+                "rc": rc,
+            })
+            print(f"[{point_key(point)}] {script}: {took:.1f}s, {ncmd} cmds, rc={rc}")
+            if rc != 0 and not args.keep_going:
+                return rows
+    return rows
+
+
+def add_marginal(rows: list[dict]):
+    # Цена одной добавленной сущности между соседними точками шага:
+    # (секунды - секунды прошлой точки) / (сущности - сущности прошлой точки).
+    # Там, где объём шага не вырос (VRRP упирается в 70) или шаг упал, — None.
+    prev = {}
+    for r in rows:
+        p = prev.get(r["step"])
+        r["marginal_sec_per_entity"] = None
+        if r["rc"] != 0:
+            continue
+        if p is not None and r["entities"] > p["entities"]:
+            r["marginal_sec_per_entity"] = round(
+                (r["seconds"] - p["seconds"]) / (r["entities"] - p["entities"]), 5
+            )
+        prev[r["step"]] = r
+
+
+def check_nonlinear(rows: list[dict]) -> list[str]:
+    # Сравниваем прирост на сущность с первым приростом этого шага (между двумя первыми точками).
+    warn = []
+    first = {}
+    for r in rows:
+        m = r["marginal_sec_per_entity"]
+        if m is None:
+            continue
+        base = first.setdefault(r["step"], r)
+        if base is r or base["marginal_sec_per_entity"] <= 0:
+            continue
+        ratio = m / base["marginal_sec_per_entity"]
+        if ratio > cfg.SWEEP_NONLINEAR_RATIO:
+            warn.append(
+                f"NONLINEAR {r['step']} [{r['point']}]: "
+                f"{m}s per added entity, x{ratio:.2f} vs [{base['point']}]"
+            )
+    return warn
+
+
+def check_baseline(rows: list[dict]) -> list[str]:
+    if not BASELINE.exists():
+        return []
+    base = json.loads(BASELINE.read_text(encoding="utf-8"))
+    warn = []
+    for r in rows:
+        prev = base.get(f"{r['step']}|{r['point']}")
+        if prev and r["seconds"] > prev * (1 + cfg.SWEEP_TOLERANCE):
+            warn.append(
+                f"SLOWER {r['step']} [{r['point']}]: {r['seconds']}s vs baseline {prev}s"
+            )
+    return warn
+
+
+def save(rows: list[dict], warn: list[str]) -> Path:
+    SWEEP_DIR.mkdir(parents=True, exist_ok=True)
+    stamp = rows[0]["stamp"]
+    csv_path = SWEEP_DIR / f"{stamp}_sweep.csv"
+    with open(csv_path, "w", newline="", encoding="utf-8") as f:
+        w = csv.DictWriter(f, fieldnames=list(rows[0]))
+        w.writeheader()
+        w.writerows(rows)
+    json_path = SWEEP_DIR / f"{stamp}_sweep.json"
+    json_path.write_text(
+        json.dumps({"rows": rows, "warnings": warn}, indent=2, ensure_ascii=False),
+        encoding="utf-8",
+    )
+    return csv_path
+
+
+def save_baseline(rows: list[dict]):
+    base = {f"{r['step']}|{r['point']}": r["seconds"] for r in rows if r["rc"] == 0}
+    SWEEP_DIR.mkdir(parents=True, exist_ok=True)
+    BASELINE.write_text(json.dumps(base, indent=2), encoding="utf-8")
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description="Scale sweep для create/delete шагов")
+    ap.add_argument("--host", help="переопределить cfg.HOST (например, симулятор)")
+    ap.add_argument("--port", type=int, help="переопределить cfg.PORT")
+    ap.add_argument("--device-type", help="переопределить cfg.DEVICE_TYPE")
+    ap.add_argument("--no-delete", action="store_true", help="не запускать 90_delete_all")
+    ap.add_argument("--keep-going", action="store_true", help="не останавливаться на упавшем шаге")
+    ap.add_argument("--save-baseline", action="store_true", help="сохранить прогон как baseline")
+    args = ap.parse_args()
+
+    rows = sweep(args)
+    if not rows:
+        print("Пустая SWEEP_GRID — нечего мерить")
+        return 1
+
+    add_marginal(rows)
+    warn = check_nonlinear(rows) + check_baseline(rows)
+    path = save(rows, warn)
+    for line in warn:
+        print(line)
+    if args.save_baseline:
+        save_baseline(rows)
+    print(f"Результаты: {path}")
+
+    # Ненулевой код — чтобы периодический job заметил регрессию
+    if any(r["rc"] != 0 for r in rows):
+        return 1
+    return 2 if any(w.startswith("SLOWER") for w in warn) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,119 @@
+# 70_drift_check_b4.py
+import argparse
+import json
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import b4_cfg as cfg
+import b4_drift as drift
+import b4_rollback as rb
+from b4_netmiko import B4, ts
+from b4_runcfg import parse_blocks
+
+# =========================
+# Идея скрипта
+# =========================
+# Проверяем, не правил ли кто-то руками VLAN/SVI/VRF/VRRP/OSPF после нашего прогона:
+# 1) снимаем running-config (DRIFT_CMDS) со всех хостов параллельно (DRIFT_WORKERS)
+# 2) режем на секции-сущности, хэшируем и сравниваем с baseline,
+#    сохранённым после последнего успешного прогона (b4_drift)
+# 3) печатаем только то, что разошлось: changed / missing / added
+# С --reapply разошедшиеся (changed/missing) сущности возвращаются к baseline,
+# и проверка повторяется. Появившиеся руками (added) только показываются — их не удаляем.
+#
+# python 70_drift_check_b4.py                        — HOST (или DRIFT_HOSTS)
+# python 70_drift_check_b4.py --hosts A B C --reapply
+# python 70_drift_check_b4.py --accept               — текущее состояние считать новым baseline
+#
+# Код выхода: 0 — дрейфа нет, 3 — есть дрейф, 1 — какой-то хост не проверился.
+
+ap = argparse.ArgumentParser(description="Проверка дрейфа конфигурации по хэшам секций")
+ap.add_argument("--hosts", nargs="+", default=cfg.DRIFT_HOSTS or [cfg.HOST])
+ap.add_argument("--reapply", action="store_true", help="вернуть разошедшиеся сущности к baseline")
+ap.add_argument("--accept", action="store_true", help="сохранить текущее состояние как baseline")
+args = ap.parse_args()
+
+
+def pull(r: B4) -> drift.Sections:
+    text = "\n".join(r.show(c, read_timeout=cfg.READ_TIMEOUT) for c in cfg.DRIFT_CMDS)
+    return drift.sections(parse_blocks(text), cfg.TRUNK_IF)
+
+
+def check(host: str) -> dict:
+    res = {"host": host}
+    base = drift.load_baseline(cfg.OUT_DIR, host)
+    if base is None and not args.accept:
+        res["error"] = f"нет baseline ({drift.path(cfg.OUT_DIR, host)})"
+        stale = drift.stale_path(cfg.OUT_DIR, host)
+        if stale.exists():
+            res["error"] += f", снят после {json.loads(stale.read_text(encoding='utf-8'))['invalidated']['reason']}"
+        return res
+    # Baseline от запуска, который потом откатили: --reapply вернул бы откаченное
+    if args.reapply and base and base.get("run_id") and \
+            (rb.runs_dir(cfg.OUT_DIR) / base["run_id"] / f"rolled_back_{host}.json").exists():
+        res["error"] = f"baseline от откаченного запуска {base['run_id']} — --reapply отменён; --accept или новый прогон"
+        return res
+
+    r = B4.from_cfg(cfg, tag=f"70_drift_{host}", host=host)
+    # Периодической проверке пробы возможностей не нужны
+    r.probe_caps = False
+    try:
+        r.open()
+        secs = pull(r)
+        if args.accept:
+            drift.save_baseline(cfg.OUT_DIR, host, secs, run_id=r.run_id)
+            res["accepted"] = len(secs)
+            return res
+
+        res.update(drift.compare(base, secs))
+        todo = res["changed"] + res["missing"]
+        if args.reapply and todo:
+            cmds = drift.repair_cmds(base, secs, todo)
+            failed = r.cfg(cmds, per_batch=cfg.CFG_PER_BATCH, read_timeout=cfg.READ_TIMEOUT, sleep_between=cfg.CFG_SLEEP)
+            after = drift.compare(base, pull(r))
+            res["reapplied"] = len(todo)
+            res["still"] = [k for k in todo if k in after["changed"] + after["missing"]]
+            res["failed_commands"] = len(failed)
+    except Exception as e:
+        res["error"] = f"{type(e).__name__}: {e}"
+    finally:
+        r.close()
+    return res
+
+
+with ThreadPoolExecutor(max_workers=cfg.DRIFT_WORKERS) as pool:
+    results = list(pool.map(check, args.hosts))
+
+errors = drifted = False
+for res in results:
+    host = res["host"]
+    if "error" in res:
+        print(f"{host}: ERROR {res['error']}")
+        errors = True
+        continue
+    if "accepted" in res:
+        print(f"{host}: baseline saved, {res['accepted']} sections")
+        continue
+    n = {k: len(res[k]) for k in ("changed", "missing", "added")}
+    if not any(n.values()):
+        print(f"{host}: OK")
+        continue
+    # После --reapply дрейфом остаётся то, что не вернулось, и добавленное руками
+    drifted = drifted or bool(res.get("still", res["changed"] + res["missing"]) or res["added"])
+    print(f"{host}: DRIFT " + ", ".join(f"{v} {k}" for k, v in n.items() if v))
+    for k in ("changed", "missing", "added"):
+        for key in res[k][:20]:
+            print(f"  {k:<8} {key}")
+        if len(res[k]) > 20:
+            print(f"  {k:<8} ... +{len(res[k]) - 20}")
+    if "reapplied" in res:
+        print(f"  reapplied {res['reapplied']}, still drifted {len(res['still'])}"
+              + (f", {res['failed_commands']} failed commands" if res["failed_commands"] else ""))
+
+# Отчёт целиком — для периодической задачи / мониторинга
+report = Path(cfg.OUT_DIR) / "drift" / "reports" / f"{ts()}.json"
+report.parent.mkdir(parents=True, exist_ok=True)
+report.write_text(json.dumps(results, indent=2, ensure_ascii=False), encoding="utf-8")
+
+sys.exit(1 if errors else 3 if drifted else 0)
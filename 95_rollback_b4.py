@@ -0,0 +1,87 @@
+# 95_rollback_b4.py
+import argparse
+import json
+import sys
+from pathlib import Path
+
+import b4_cfg as cfg
+import b4_drift as drift
+import b4_rollback as rb
+from b4_netmiko import B4
+
+# =========================
+# Идея скрипта
+# =========================
+# Откат одного запуска по журналу (out_b4/runs/<run_id>/journal.jsonl):
+# 1) берём записи шагов этого запуска для cfg.HOST
+# 2) собираем их обратные команды в обратном порядке зависимостей
+# 3) льём только их
+# В отличие от 90_delete_all, удаляется только то, что создал этот запуск,
+# включая VRRP и OSPF, а то, что было на устройстве раньше, не трогается.
+# После отката baseline дрейфа хоста снимается (b4_drift.invalidate).
+# Запуск помечается откаченным, только если ни одна команда отката не упала;
+# иначе упавшие команды запоминаются, и следующий запуск доливает только их
+# (успевшие "no ..." второй раз сами упали бы).
+#
+# python 95_rollback_b4.py               — откатить последний запуск
+# python 95_rollback_b4.py <run_id>      — откатить конкретный
+# python 95_rollback_b4.py --dry-run     — только показать план
+
+ap = argparse.ArgumentParser(description="Откат запуска по журналу изменений")
+ap.add_argument("run_id", nargs="?", help="run_id (по умолчанию — последний)")
+ap.add_argument("--dry-run", action="store_true", help="только показать команды отката")
+ap.add_argument("--force", action="store_true", help="откатить повторно уже откаченный запуск")
+args = ap.parse_args()
+
+run_id = args.run_id or rb.latest_run(cfg.OUT_DIR)
+if not run_id:
+    sys.exit(f"В {rb.runs_dir(cfg.OUT_DIR)} нет журналов")
+
+# Отметки — на хост: у HA-пары один run_id на оба коммутатора
+done_mark = rb.runs_dir(cfg.OUT_DIR) / run_id / f"rolled_back_{cfg.HOST}.json"
+pending = rb.runs_dir(cfg.OUT_DIR) / run_id / f"rollback_pending_{cfg.HOST}.json"
+if done_mark.exists() and not args.force:
+    sys.exit(f"{run_id} уже откачен ({done_mark}); --force, чтобы повторить")
+
+entries = rb.load(cfg.OUT_DIR, run_id, host=cfg.HOST)
+cmds = rb.plan(entries)
+
+if pending.exists() and not args.force:
+    # Прошлый откат прошёл частично — доливаем только то, что тогда упало
+    cmds = json.loads(pending.read_text(encoding="utf-8"))["failed"]
+    print(f"run_id {run_id}: продолжаем частичный откат ({pending.name}), {len(cmds)} команд")
+else:
+    print(f"run_id {run_id}: {len(entries)} шаг(ов), {len(cmds)} команд отката")
+if args.dry_run or not cmds:
+    print("\n".join(cmds))
+    sys.exit(0)
+
+r = B4.from_cfg(cfg, tag="95_rollback").open()
+# Какие команды отката упали, нужно знать всегда — от этого зависит отметка
+r.find_failed = True
+r.save_text("rollback_plan", "\n".join(cmds))
+
+failed = r.cfg(cmds, per_batch=cfg.CFG_PER_BATCH, read_timeout=cfg.READ_TIMEOUT, sleep_between=cfg.CFG_SLEEP)
+
+# Откаченное (даже частично) больше не совпадает с baseline дрейфа —
+# иначе 70_drift_check --reapply создал бы всё это заново
+if drift.invalidate(cfg.OUT_DIR, cfg.HOST, f"95_rollback {run_id}"):
+    print(f"drift baseline {cfg.HOST} снят ({drift.stale_path(cfg.OUT_DIR, cfg.HOST)})")
+
+if failed:
+    Path(pending).write_text(
+        json.dumps({"stamp": r.stamp, "host": cfg.HOST, "failed": failed}, ensure_ascii=False),
+        encoding="utf-8",
+    )
+else:
+    Path(pending).unlink(missing_ok=True)
+    Path(done_mark).write_text(
+        json.dumps({"stamp": r.stamp, "host": cfg.HOST, "commands": len(cmds)}), encoding="utf-8"
+    )
+
+r.save_text("show_run_after", r.show("show running-config", read_timeout=cfg.READ_TIMEOUT))
+r.close()
+
+if failed:
+    sys.exit(f"FAIL: {len(failed)} команд отката не применились (errors.log); "
+             f"повторный запуск дольёт только их, --force — весь откат заново")
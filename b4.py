@@ -0,0 +1,280 @@
+# b4.py
+import time
+
+_T0 = time.perf_counter()
+
+import argparse
+import sys
+from pathlib import Path
+from typing import List, Sequence
+
+# =========================
+# Идея скрипта
+# =========================
+# Одна точка входа вместо россыпи скриптов:
+#   python b4.py step 10            — шаг 10_create_vlans_b4.py (в этом же процессе)
+#   python b4.py step 95 --dry-run  — опции шага передаются ему; позиционные — после "--":
+#   python b4.py step 95 -- <run_id> --dry-run
+#   python b4.py pipeline           — все шаги по графу (как run_all_b4.py)
+#   python b4.py plan [10 31 ...]   — какие команды уйдут на устройство, без подключения
+#   python b4.py parse FILE...      — сводка по сохранённым show из out_b4
+#   python b4.py diff A B           — разница двух снимков running-config по блокам
+#   python b4.py imports            — сколько стоят импорты офлайн-команд (бюджет CLI_IMPORT_BUDGET)
+#   python b4.py index              — дочитать новые логи out_b4 в индекс (b4_index)
+#   python b4.py query --vlan 151   — история сущности / --error "текст" — где была ошибка
+#
+# Netmiko/paramiko/cryptography грузятся только когда реально открывается сессия
+# (B4.connect), поэтому plan/parse/diff стартуют за доли секунды.
+# Здесь наверху — только stdlib, модули проекта импортируются внутри команд.
+
+HERE = Path(__file__).resolve().parent
+
+
+def find_step(name: str) -> Path:
+    # "10" / "10_create_vlans" / "10_create_vlans_b4.py" -> путь к скрипту
+    p = HERE / name
+    if p.is_file():
+        return p
+    hits = sorted(HERE.glob(f"{name}*_b4.py")) or sorted(HERE.glob(f"{name}_*_b4.py"))
+    if len(hits) != 1:
+        raise SystemExit(f"step {name!r}: " + (f"ambiguous {[h.name for h in hits]}" if hits else "not found"))
+    return hits[0]
+
+
+def run_script(path: Path, script_args: Sequence[str] = ()) -> int:
+    # Шаг выполняется как __main__ в этом процессе: импорты (и netmiko) — один раз на все шаги
+    import runpy
+
+    argv = sys.argv
+    sys.argv = [str(path)] + list(script_args)
+    try:
+        runpy.run_path(str(path), run_name="__main__")
+        return 0
+    except SystemExit as e:
+        return e.code if isinstance(e.code, int) else (0 if e.code is None else 1)
+    finally:
+        sys.argv = argv
+
+
+# -------------------------
+# Команды
+# -------------------------
+
+def cmd_step(args) -> int:
+    rc = 0
+    for name in args.steps:
+        rc = run_script(find_step(name), args.script_args)
+        if rc:
+            break
+    return rc
+
+
+def cmd_pipeline(args) -> int:
+    if not args.inproc:
+        return run_script(HERE / "run_all_b4.py")
+
+    # Последовательно в одном процессе — без параллели, зато без запуска интерпретатора на каждый шаг
+    import b4_cfg as cfg
+    from b4_pipeline import STEPS, check_graph
+
+    check_graph(STEPS)
+    cfg.RUN_ID = cfg.RUN_ID or f"{time.strftime('%Y%m%d-%H%M%S')}_run_all"
+    print(f"run_id: {cfg.RUN_ID}")
+    for step in STEPS:
+        t0 = time.time()
+        rc = run_script(HERE / step)
+        print(f"{step:<28} rc={rc} {time.time() - t0:.1f}s")
+        if rc:
+            print("FAIL")
+            return 1
+    print("OK")
+    return 0
+
+
+def cmd_plan(args) -> int:
+    import b4_plan
+
+    steps = args.steps or [s for s in b4_plan.PLANS if s != "90"]
+    unknown = [s for s in steps if s not in b4_plan.PLANS]
+    if unknown:
+        raise SystemExit(f"no plan for steps {unknown}, known: {list(b4_plan.PLANS)}")
+    if args.count:
+        for s in steps:
+            print(f"{s}: {len(b4_plan.PLANS[s]())}")
+    else:
+        print("\n".join(b4_plan.render(steps)))
+    return 0
+
+
+def cmd_parse(args) -> int:
+    import b4_parse
+
+    for f in args.files:
+        print(f"== {f}")
+        print("\n".join(b4_parse.summarize(Path(f).read_text(encoding="utf-8", errors="replace"))))
+    return 0
+
+
+def cmd_diff(args) -> int:
+    from b4_runcfg import diff_blocks, parse_blocks
+
+    a, b = (parse_blocks(Path(f).read_text(encoding="utf-8", errors="replace")) for f in (args.a, args.b))
+    added, removed, changed = diff_blocks(a, b)
+    for h in removed:
+        print(f"- {h}")
+    for h in added:
+        print(f"+ {h}")
+    for h, (plus, minus) in changed.items():
+        print(f"~ {h}")
+        print("\n".join([f"    - {x}" for x in minus] + [f"    + {x}" for x in plus]))
+    print(f"{len(added)} added, {len(removed)} removed, {len(changed)} changed")
+    return 1 if added or removed or changed else 0
+
+
+def cmd_index(args) -> int:
+    import b4_cfg as cfg
+    import b4_index
+
+    st = b4_index.update(cfg.OUT_DIR)
+    print(
+        f"{st['files']} files updated, {st['bytes'] / 1e6:.1f} MB read, "
+        f"{st['total_files']} files in index, {st['seconds']}s" + ("" if st["fts"] else " (no FTS5, LIKE search)")
+    )
+    return 0
+
+
+def cmd_query(args) -> int:
+    import b4_cfg as cfg
+    import b4_index
+
+    if not args.no_update:
+        b4_index.update(cfg.OUT_DIR)
+    t0 = time.perf_counter()
+    if args.error:
+        rows = b4_index.errors(cfg.OUT_DIR, args.error, limit=args.limit, tag=args.tag)
+        for stamp, tag, path, line, header, text in rows:
+            print(f"{stamp}  {tag:<24} {Path(path).name}:{line}  [{header}] {text}")
+    else:
+        kind, value = next((k, getattr(args, k)) for k in b4_index.KINDS if getattr(args, k))
+        rows = b4_index.history(cfg.OUT_DIR, kind, value, limit=args.limit, file_kind=args.file_kind)
+        for stamp, tag, fkind, path, line, hits in rows:
+            print(f"{stamp}  {tag:<24} {fkind:<9} {Path(path).name}:{line}  x{hits}")
+    print(f"{len(rows)} rows, {1000 * (time.perf_counter() - t0):.1f}ms", file=sys.stderr)
+    return 0
+
+
+def import_times(argv) -> tuple:
+    # (время процесса, {модуль верхнего уровня: сек}) по python -X importtime
+    import subprocess
+
+    t0 = time.perf_counter()
+    p = subprocess.run(
+        [sys.executable, "-X", "importtime"] + argv,
+        capture_output=True, text=True, cwd=str(HERE),
+    )
+    wall = time.perf_counter() - t0
+    rows = []
+    for line in p.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cum, name = line[len("import time:"):].split("|")
+        rows.append((len(name) - len(name.lstrip()), name.strip(), int(cum) / 1e6))
+    top = min((lvl for lvl, _, _ in rows), default=0)
+    return wall, {name: sec for lvl, name, sec in rows if lvl == top}
+
+
+def cmd_imports(args) -> int:
+    import importlib.util
+
+    import b4_cfg as cfg
+
+    # Интерпретатор без наших модулей — чтобы отделить его старт от наших импортов
+    base_wall, base = import_times(["-c", "pass"])
+    wall, mods = import_times([str(HERE / "b4.py"), "plan", "--count"])
+    own = {m: s for m, s in mods.items() if m not in base}
+    total = sum(own.values())
+
+    print(f"b4.py plan: {wall:.3f}s wall (bare python {base_wall:.3f}s), imports {total:.3f}s")
+    for m, s in sorted(own.items(), key=lambda x: -x[1])[: args.top]:
+        print(f"  {s:.3f}s  {m}")
+
+    heavy = [m for m in ("netmiko", "paramiko", "cryptography") if m in mods]
+    if heavy:
+        print(f"offline path imports transport: {', '.join(heavy)}")
+
+    if importlib.util.find_spec("netmiko"):
+        _, net = import_times(["-c", "import netmiko"])
+        print(f"transport (netmiko) import, paid only by steps: {sum(s for m, s in net.items() if m not in base):.3f}s")
+
+    over = total > cfg.CLI_IMPORT_BUDGET
+    print(f"budget {cfg.CLI_IMPORT_BUDGET}s: {'OVER' if over else 'OK'}")
+    return 1 if over or heavy else 0
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(prog="b4.py", description="B4Com/OcNOS automation CLI")
+    ap.add_argument("--timing", action="store_true", help="print startup time to stderr")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+
+    p = sub.add_parser("step", help="run step scripts in this process (step options pass through)")
+    p.add_argument("steps", nargs="+", help="10, 10_create_vlans or a file name; step positionals go after --")
+    p.set_defaults(func=cmd_step)
+
+    p = sub.add_parser("pipeline", help="run all steps (run_all_b4.py)")
+    p.add_argument("--inproc", action="store_true", help="serially in this process instead of the DAG")
+    p.set_defaults(func=cmd_pipeline)
+
+    p = sub.add_parser("plan", help="render commands offline from b4_cfg")
+    p.add_argument("steps", nargs="*", help="step numbers (default: all create steps)")
+    p.add_argument("--count", action="store_true", help="only command counts")
+    p.set_defaults(func=cmd_plan)
+
+    p = sub.add_parser("parse", help="summarize saved show outputs")
+    p.add_argument("files", nargs="+")
+    p.set_defaults(func=cmd_parse)
+
+    p = sub.add_parser("diff", help="diff two running-config snapshots by block")
+    p.add_argument("a")
+    p.add_argument("b")
+    p.set_defaults(func=cmd_diff)
+
+    p = sub.add_parser("imports", help="import-time report for offline commands")
+    p.add_argument("--top", type=int, default=10)
+    p.set_defaults(func=cmd_imports)
+
+    p = sub.add_parser("index", help="index new out_b4 logs incrementally")
+    p.set_defaults(func=cmd_index)
+
+    p = sub.add_parser("query", help="entity history or error search over the log index")
+    g = p.add_mutually_exclusive_group(required=True)
+    g.add_argument("--vlan")
+    g.add_argument("--svi", help="vlan1.X")
+    g.add_argument("--vrf")
+    g.add_argument("--vrid")
+    g.add_argument("--ospf", help="OSPF PID")
+    g.add_argument("--error", help="text in errors.log")
+    p.add_argument("--file-kind", help="session / commands / errors / txt (commands — only pushes)")
+    p.add_argument("--tag", help="only runs whose tag contains this (errors)")
+    p.add_argument("--limit", type=int, default=50)
+    p.add_argument("--no-update", action="store_true", help="do not index new logs first")
+    p.set_defaults(func=cmd_query)
+
+    # Всё после "--" и незнакомые опции команды step — аргументы самого шага
+    argv = sys.argv[1:]
+    extra: List[str] = []
+    if "--" in argv:
+        cut = argv.index("--")
+        argv, extra = argv[:cut], argv[cut + 1:]
+    args, unknown = ap.parse_known_args(argv)
+    if args.cmd != "step" and (unknown or extra):
+        ap.error(f"unrecognized arguments: {' '.join(unknown + extra)}")
+    args.script_args = unknown + extra
+    if args.timing:
+        print(f"[startup {1000 * (time.perf_counter() - _T0):.1f}ms]", file=sys.stderr)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    # Модули проекта — рядом с b4.py; out_b4/ пишется в текущую папку, как при python NN_....py
+    sys.path.insert(0, str(HERE))
+    sys.exit(main())
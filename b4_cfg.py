@@ -6,15 +6,61 @@ PORT = 22                       # SSH порт,при работе в симул
 USER = "admin"                     # Имя пользователя
 PASSWORD = "admin"                 # Пароль 
 DEVICE_TYPE = "ipinfusion_ocnos"   # Netmiko device_type для OcNOS/B4Com, при работе в симуляторе gns3 можно использовать DEVICE_TYPE = "ipinfusion_ocnos_telnet"
+EMULATED = None                    # Эмулятор (GNS3/QEMU): None — по кэшу фактов (show version), True/False — принудительно
 
 # =========================
 # Логи и тайминги
 # =========================
 OUT_DIR = "out_b4"                 # Папка куда складываем логи (session/commands/errors/show)
+SESSION_LOG_MODE = "full"          # session.log: full / gzip (сжатый поток) / ring (в памяти, на диск только при ошибке) / off
+SESSION_LOG_RING_KB = 256          # Размер кольцевого буфера для SESSION_LOG_MODE = "ring" (КБ)
 GLOBAL_DELAY_FACTOR = 1.8          # Множитель задержек Netmiko: ниже — быстрее, выше — стабильнее
 READ_TIMEOUT = 300                 # Таймаут чтения (сек) для show и конфигурации
 CFG_PER_BATCH = 20                 # Размер пакета команд в send_config_set
 CFG_SLEEP = 0.3                   # Пауза между пакетами команд (сек)
+CFG_FIND_FAILED = True             # В пачке с ошибкой находить упавшие команды по эху в выводе (пачка не повторяется)
+CFG_RETRY_FAILED = 1               # Сколько раз повторять только упавшие команды (0 — не повторять)
+
+# Таймауты, выученные по истории задержек (out_b4/latency/<HOST>.json).
+# READ_TIMEOUT при этом остаётся потолком.
+ADAPTIVE_TIMEOUT = True            # False — всегда ждать READ_TIMEOUT, как раньше
+TIMEOUT_FLOOR = 5                  # Минимальный запас (сек) к выученному таймауту
+TIMEOUT_MARGIN = 3.0               # Множитель к p95 задержки/объёма
+TIMEOUT_MIN_SAMPLES = 5            # Сколько замеров нужно, прежде чем доверять истории
+
+# run_all_b4.py: сколько шагов (и SSH-сессий к устройству) может идти одновременно.
+# 1 — строго последовательно, как раньше.
+PIPELINE_SESSIONS = 3
+
+# Журнал для отката (95_rollback_b4.py): перед каждым config-шагом снимаются
+# нужные ему секции running-config, после — пишутся применённые и обратные команды.
+ROLLBACK_JOURNAL = True
+RUN_ID = ""                        # Пусто — свой run_id на каждый запуск шага; run_all задаёт общий
+
+# Демон тёплых сессий (python b4_daemon.py). Если DAEMON задан и демон запущен,
+# шаги берут у него готовую сессию вместо своего SSH-подключения.
+DAEMON = ""                        # Например "127.0.0.1:8722"; пусто — всегда подключаться напрямую
+DAEMON_MAX_PER_HOST = 4            # Максимум сессий в пуле на один хост
+DAEMON_WARM = 1                    # Сколько свободных сессий держать наготове на хост
+DAEMON_KEEPALIVE = 30              # Период keepalive/проверки простаивающих сессий (сек)
+DAEMON_IDLE_TIMEOUT = 900          # Закрывать сессии, простаивающие дольше (сек)
+
+# Факты/возможности устройства (out_b4/facts/<HOST>.json), пересняются при смене прошивки.
+# По ним шаги выбирают быстрые пути (например, VLAN диапазоном одной командой).
+PROBE_CAPS = True
+PROBE_VLANS = [4093, 4094]         # Пробный диапазон для проверки range-синтаксиса (подсказкой "?", без выполнения)
+
+# Обратная связь по нагрузке: на больших пушах вторая сессия снимает CPU устройства,
+# и пауза между пачками подстраивается под неё (CFG_SLEEP — только стартовая пауза).
+LOAD_MONITOR = False
+LOAD_CMD = "show process cpu"      # Команда, из вывода которой берётся загрузка CPU (зависит от прошивки)
+LOAD_INTERVAL = 2.0                # Как часто снимать загрузку (сек)
+LOAD_LOW = 40                      # Ниже — ускоряемся
+LOAD_HIGH = 70                     # Выше — замедляемся
+LOAD_CRITICAL = 90                 # Выше — пауза, пока не упадёт ниже LOAD_HIGH
+LOAD_MAX_SLEEP = 5.0               # Максимальная пауза между пачками (сек)
+LOAD_MAX_PAUSE = 120               # Дольше не стоим даже при критической нагрузке (сек)
+LOAD_MIN_COMMANDS = 200            # Монитор включается только для пушей от стольких команд
 
 # =========================
 # L2 bridge / trunk
@@ -50,7 +96,14 @@ VIP_LAST_OCTET = 254               # Последний октет VIP для VR
 # =========================
 VRRP_COUNT = 70                    # Количество VRRP-групп
 VRRP_START_ID = 1                  # Первый VRID
-VRRP_PRIORITY = 254                # Приоритет VRRP
+VRRP_PRIORITY = 254                # Приоритет VRRP (в паре — приоритет мастера)
+
+# HA-пара (36_create_vrrp_pair_b4.py): оба коммутатора настраиваются одновременно,
+# реальные IP на SVI — .PAIR_HOST_OCTETS, общий VIP — .VIP_LAST_OCTET
+PAIR_HOSTS = []                    # Два хоста пары, например ["10.10.10.10", "10.10.10.11"]
+PAIR_HOST_OCTETS = [2, 3]          # Последний октет реального IP на SVI у первого/второго хоста
+VRRP_BACKUP_PRIORITY = 100         # Приоритет backup-а
+VRRP_ALTERNATE = True              # Мастер чередуется по группам: чётные — первый хост, нечётные — второй
 
 # =========================
 # OSPF 
@@ -58,3 +111,54 @@ VRRP_PRIORITY = 254                # Приоритет VRRP
 OSPF_ENABLE = True                 # Включение/отключение OSPF-этапа
 OSPF_IDX_START = 0                 # Смещение индекса сетей для OSPF
 OSPF_PROCESS_BASE = 1              # Базовый PID; далее PID = base + i
+
+# =========================
+# Scale sweep (60_scale_sweep_b4.py)
+# =========================
+# Точки сетки: в каждой задаём объёмы, с которыми прогоняются шаги create/delete.
+SWEEP_GRID = [
+    {"VLAN_COUNT": 10,   "SVI_COUNT": 10,   "VRF_COUNT": 10,  "VRRP_COUNT": 10},
+    {"VLAN_COUNT": 100,  "SVI_COUNT": 100,  "VRF_COUNT": 100, "VRRP_COUNT": 70},
+    {"VLAN_COUNT": 500,  "SVI_COUNT": 500,  "VRF_COUNT": 300, "VRRP_COUNT": 70},
+    {"VLAN_COUNT": 1000, "SVI_COUNT": 1000, "VRF_COUNT": 600, "VRRP_COUNT": 70},
+    {"VLAN_COUNT": 2100, "SVI_COUNT": 2100, "VRF_COUNT": 600, "VRRP_COUNT": 70},
+]
+SWEEP_TOLERANCE = 0.15             # Насколько шаг может быть медленнее baseline (0.15 = +15%)
+SWEEP_NONLINEAR_RATIO = 1.5        # Во сколько раз может вырасти прирост времени на сущность (Δсек/Δсущностей) относительно первого
+
+# =========================
+# Дрейф конфигурации (70_drift_check_b4.py)
+# =========================
+# Baseline секций running-config сохраняется после успешного прогона
+# (40_collect в составе run_all, 36_create_vrrp_pair) в out_b4/drift/<HOST>.json.
+# 95_rollback и 90_delete_all его снимают (out_b4/drift/stale/<HOST>.json).
+DRIFT_HOSTS = []                   # Какие хосты проверять; пусто — только HOST
+DRIFT_WORKERS = 8                  # Сколько хостов проверять одновременно
+DRIFT_CMDS = ["show running-config"]  # Откуда брать секции (можно заменить на show running-config <секция>, если прошивка умеет)
+
+# =========================
+# CLI (b4.py)
+# =========================
+CLI_IMPORT_BUDGET = 0.5            # Сек: бюджет на импорты офлайн-команд b4.py (проверка: b4.py imports)
+
+# =========================
+# Переопределение из окружения
+# =========================
+# Любой параметр выше можно подменить переменной окружения B4_<ИМЯ>, не трогая файл:
+#   B4_VLAN_COUNT=500 python 10_create_vlans_b4.py
+# Списки/словари задаются JSON-ом. Этим пользуются обвязки (sweep и т.п.),
+# которые гоняют одни и те же шаги с разными объёмами и на разных хостах.
+# Блок должен оставаться последним в файле.
+import json as _json
+import os as _os
+
+for _name, _val in list(globals().items()):
+    _env = _os.environ.get(f"B4_{_name}") if _name.isupper() else None
+    if _env is None:
+        continue
+    if isinstance(_val, bool):
+        globals()[_name] = _env.strip().lower() in ("1", "true", "yes", "on")
+    elif isinstance(_val, (int, float, str)):
+        globals()[_name] = type(_val)(_env)
+    else:
+        globals()[_name] = _json.loads(_env)
@@ -0,0 +1,162 @@
+from __future__ import annotations
+
+import re
+from typing import List, Optional, Sequence, Tuple
+
+
+# =========================
+# Пачки по границам блоков CLI
+# =========================
+# Если резать команды ровно каждые per_batch строк, пачка легко начинается
+# с середины блока: "ip address ..." уезжает от своего "interface vlan1.X",
+# "virtual-ip" — от "router vrrp". Такую пачку нельзя безопасно повторить:
+# устройство применит её в том режиме, в котором оказалось.
+#
+# Поэтому сначала разбираем поток на блоки (заголовок режима + его команды),
+# и каждая пачка состоит из целых блоков, каждый из которых явно входит
+# в свой режим и выходит из него через "exit".
+#
+# Повторять пачку целиком или по частям при этом нельзя: не все команды
+# идемпотентны ("no vlan", "no interface", удаления из отката на втором
+# проходе сами падают). Упавшие команды ищем в выводе самой пачки —
+# по эху отправленных команд (strip_command=False) вывод режется на куски,
+# и ошибка относится к той команде, после эха которой она напечатана.
+
+# Команды, которые открывают под-режим конфигурации
+CONTEXT_RE = re.compile(
+    r"^(interface \S+|router \S+.*|vlan database|ip vrf (?!forwarding)\S+"
+    r"|route-map \S+.*|line \S+.*|ip access-list \S+.*)$"
+)
+
+# Команды верхнего уровня, которые закрывают незакрытый блок
+# (например, "no ip vrf X" сразу после "ip vrf Y" без exit)
+TOPLEVEL_RE = re.compile(
+    r"^(no (interface|router|route-map|ip access-list) .*|no ip vrf (?!forwarding)\S+"
+    r"|no bridge \d+|bridge \d+ .*)$"
+)
+
+# (заголовок или None для одиночной команды верхнего уровня, команды блока)
+Block = Tuple[Optional[str], List[str]]
+
+
+def split_blocks(commands: Sequence[str]) -> List[Block]:
+    blocks: List[Block] = []
+    cur: Optional[Block] = None
+    for raw in commands:
+        cmd = raw.strip()
+        if not cmd:
+            continue
+        if cmd in ("exit", "end"):
+            cur = None
+            continue
+        if CONTEXT_RE.match(cmd):
+            cur = (cmd, [])
+            blocks.append(cur)
+        elif cur is not None and not TOPLEVEL_RE.match(cmd):
+            cur[1].append(cmd)
+        else:
+            cur = None
+            blocks.append((None, [cmd]))
+    return blocks
+
+
+def render(blocks: Sequence[Block]) -> List[str]:
+    out: List[str] = []
+    for hdr, body in blocks:
+        if hdr is None:
+            out += body
+        else:
+            out += [hdr] + body + ["exit"]
+    return out
+
+
+def pack(blocks: Sequence[Block], per_batch: int) -> List[List[Block]]:
+    """
+    Складываем целые блоки в пачки не длиннее per_batch строк.
+    Блок, который сам больше пачки (например, vlan database на 2000 VLAN),
+    режем на куски, каждый со своим заголовком и exit.
+    """
+    per_batch = max(per_batch, 3)
+    pieces: List[Block] = []
+    for hdr, body in blocks:
+        room = per_batch - 2 if hdr is not None else per_batch
+        if len(body) <= room:
+            pieces.append((hdr, body))
+        else:
+            pieces += [(hdr, body[i : i + room]) for i in range(0, len(body), room)]
+
+    chunks: List[List[Block]] = []
+    size = 0
+    for b in pieces:
+        n = len(b[1]) + (2 if b[0] is not None else 0)
+        if chunks and size + n <= per_batch:
+            chunks[-1].append(b)
+            size += n
+        else:
+            chunks.append([b])
+            size = n
+    return chunks
+
+
+# Сколько следующих команд проверяем, если эхо одной потерялось в шуме консоли
+_ECHO_LOOKAHEAD = 3
+
+
+def _is_echo(line: str, cmd: str) -> bool:
+    # Эхо команды: сама команда — отдельной строкой или сразу после промпта "...#"/"...>"
+    return line == cmd or line.endswith((f"#{cmd}", f">{cmd}", f"# {cmd}", f"> {cmd}"))
+
+
+def split_result(
+    blocks: Sequence[Block], output: str, err_re
+) -> Optional[Tuple[List[Block], List[Block]]]:
+    """
+    (применённые блоки, упавшие блоки) пачки — по её собственному выводу.
+    Вывод идёт по эху команд: строки между эхом команды и эхом следующей — её ответ,
+    и если в нём есть ошибка (err_re), команда упала.
+    Упавшая команда внутри блока остаётся со своим заголовком; упал сам
+    заголовок — упал весь блок (его команды ушли не в тот режим).
+    None — ошибку не к чему привязать (эхо не найдено), какие команды упали, неизвестно.
+    """
+    # (команда, номер блока, роль: "hdr" / "body" / "exit")
+    flat: List[Tuple[str, int, str]] = []
+    for bi, (hdr, body) in enumerate(blocks):
+        if hdr is not None:
+            flat.append((hdr, bi, "hdr"))
+        flat += [(c, bi, "body") for c in body]
+        if hdr is not None:
+            flat.append(("exit", bi, "exit"))
+
+    bad = set()
+    cur: Optional[int] = None
+    nxt = 0
+    for raw in output.splitlines():
+        line = raw.strip()
+        if not line:
+            continue
+        hit = next(
+            (k for k in range(nxt, min(nxt + _ECHO_LOOKAHEAD, len(flat))) if _is_echo(line, flat[k][0])),
+            None,
+        )
+        if hit is not None:
+            cur, nxt = hit, hit + 1
+        elif err_re.search(line):
+            if cur is None:
+                return None
+            bad.add(cur)
+
+    applied: List[Block] = []
+    failed: List[Block] = []
+    for bi, (hdr, body) in enumerate(blocks):
+        roles = {flat[k][2] for k in bad if flat[k][1] == bi}
+        if "hdr" in roles:
+            failed.append((hdr, body))
+            continue
+        bad_body = {flat[k][0] for k in bad if flat[k][1] == bi and flat[k][2] == "body"}
+        ok = [c for c in body if c not in bad_body]
+        if bad_body:
+            failed.append((hdr, [c for c in body if c in bad_body]))
+        # Заголовок без ошибки применился сам (interface vlan1.X создаёт SVI), даже если тело упало
+        if hdr is not None or ok:
+            applied.append((hdr, ok))
+    return applied, failed
@@ -0,0 +1,377 @@
+from __future__ import annotations
+
+import hashlib
+import ipaddress
+import json
+import socket
+import socketserver
+import sys
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+
+# =========================
+# Демон тёплых сессий
+# =========================
+# Каждый запуск шага платит за полный B4.connect(): SSH, enable, terminal length 0,
+# terminal no monitor, cmlsh transaction disable — это секунды на каждую мелочь.
+#
+# Демон держит пул уже подключённых и подготовленных B4-сессий на каждый хост
+# и отдаёт их скриптам через локальный сокет (127.0.0.1, JSON построчно).
+# Скрипт с DAEMON в cfg (B4.from_cfg) вместо своего SSH берёт сессию в аренду:
+#   {"op": "lease", "params": {...}}      -> сессия закреплена за этим сокетом
+#   {"op": "call", "method": ..., "args": [...], "kwargs": {...}}
+#   сокет закрыт                          -> сессия вернулась в пул
+# Всё остальное (пачки, логи команд/ошибок, таймауты) работает в скрипте как обычно.
+#
+# Фоном: keepalive простаивающих сессий (find_prompt), выкидывание мёртвых,
+# закрытие простаивающих дольше idle_timeout и подогрев до warm сессий на хост.
+#
+# Клиент шлёт учётные данные устройства открытым JSON при каждой аренде,
+# поэтому демон слушает только loopback — другой адрес serve() не примет.
+
+# Методы Netmiko-соединения, которые разрешено вызывать через демон
+ALLOWED = {
+    "send_command",
+    "send_command_timing",
+    "send_config_set",
+    "config_mode",
+    "exit_config_mode",
+    "check_config_mode",
+    "find_prompt",
+    "clear_buffer",
+    "is_alive",
+}
+
+
+class DaemonError(RuntimeError):
+    pass
+
+
+class ReadTimeout(DaemonError):
+    # netmiko ReadTimeout на стороне демона; клиенту netmiko для этого не нужен
+    pass
+
+
+def pool_key(params: dict) -> Tuple:
+    # Пароль в ключе — только хэшем: без правильных учёток чужую сессию не получить
+    pw = hashlib.sha256(str(params.get("password", "")).encode()).hexdigest()
+    return (params["host"], int(params.get("port", 22)), params["username"],
+            params.get("device_type", "ipinfusion_ocnos"), pw)
+
+
+def parse_addr(addr: str) -> Tuple[str, int]:
+    host, _, port = addr.rpartition(":")
+    return host or "127.0.0.1", int(port)
+
+
+def is_loopback(host: str) -> bool:
+    if host == "localhost":
+        return True
+    try:
+        return ipaddress.ip_address(host.strip("[]")).is_loopback
+    except ValueError:
+        return False
+
+
+# -------------------------
+# Клиент
+# -------------------------
+
+class DaemonConn:
+    """
+    Заменитель Netmiko-соединения внутри B4: те же методы, но вызов уходит в демон.
+    Одна аренда сессии = одно TCP-соединение с демоном.
+    """
+
+    def __init__(self, addr: str, params: dict, exc_map: Optional[dict] = None,
+                 timeout: float = 2.0):
+        self.exc_map = {"ReadTimeout": ReadTimeout, **(exc_map or {})}
+        self.sock = socket.create_connection(parse_addr(addr), timeout=timeout)
+        # Дальше таймаут задаёт сам вызов (read_timeout на стороне демона)
+        self.sock.settimeout(None)
+        self.rfile = self.sock.makefile("r", encoding="utf-8")
+        self._rpc({"op": "lease", "params": params})
+
+    def _rpc(self, req: dict):
+        self.sock.sendall((json.dumps(req) + "\n").encode("utf-8"))
+        line = self.rfile.readline()
+        if not line:
+            raise DaemonError("daemon closed the connection")
+        resp = json.loads(line)
+        if not resp.get("ok"):
+            exc = self.exc_map.get(resp.get("error"), DaemonError)
+            raise exc(resp.get("message", "daemon error"))
+        return resp.get("result")
+
+    def __getattr__(self, name):
+        if name not in ALLOWED:
+            raise AttributeError(name)
+        return lambda *args, **kwargs: self._rpc(
+            {"op": "call", "method": name, "args": list(args), "kwargs": kwargs}
+        )
+
+    def enable(self):
+        # Сессии в пуле уже в enable
+        return ""
+
+    def disconnect(self):
+        try:
+            self.rfile.close()
+            self.sock.close()
+        except OSError:
+            pass
+
+
+def stats(addr: str) -> dict:
+    with socket.create_connection(parse_addr(addr), timeout=2.0) as s:
+        s.sendall(b'{"op": "stats"}\n')
+        return json.loads(s.makefile("r", encoding="utf-8").readline())["result"]
+
+
+# -------------------------
+# Сервер
+# -------------------------
+
+class Slot:
+    def __init__(self, b4):
+        self.b4 = b4
+        self.last_used = time.time()
+        self.busy = False
+
+
+class Pool:
+    def __init__(self, out_dir: str, max_per_host: int, idle_timeout: float,
+                 keepalive: float, warm: int, b4_opts: Optional[dict] = None):
+        self.out_dir = out_dir
+        # Остальные параметры B4 из cfg (session_log_mode, ring_kb, emulated)
+        self.b4_opts = dict(b4_opts or {})
+        # Номер сессии в теге: сессии, открытые в одну секунду, не делят логи
+        self.opened = 0
+        self.max_per_host = max_per_host
+        self.idle_timeout = idle_timeout
+        self.keepalive = keepalive
+        self.warm = warm
+        self.lock = threading.Lock()
+        self.slots: Dict[Tuple, List[Slot]] = {}
+        self.params: Dict[Tuple, dict] = {}
+        # Когда хост последний раз брали в аренду — подогреваем только "живые" хосты
+        self.seen: Dict[Tuple, float] = {}
+
+    def _open(self, params: dict, n: int):
+        # B4 импортируем здесь: b4_netmiko сам импортирует клиентскую часть этого модуля
+        from b4_netmiko import B4
+
+        return B4(
+            params["host"], params["username"], params["password"],
+            params.get("device_type", "ipinfusion_ocnos"), int(params.get("port", 22)),
+            secret=params.get("secret"),
+            global_delay=params.get("global_delay_factor", 1.0),
+            out_dir=self.out_dir,
+            tag=f"daemon_{params['host']}_{n}",
+            **self.b4_opts,
+        ).open()
+
+    def acquire(self, params: dict) -> Slot:
+        key = pool_key(params)
+        with self.lock:
+            self.params[key] = params
+            self.seen[key] = time.time()
+            for slot in self.slots.get(key, []):
+                if not slot.busy and slot.b4 is not None:
+                    slot.busy = True
+                    return slot
+        return self.acquire_new(params)
+
+    def acquire_new(self, params: dict) -> Slot:
+        key = pool_key(params)
+        with self.lock:
+            slots = self.slots.setdefault(key, [])
+            if len(slots) >= self.max_per_host:
+                raise DaemonError(f"pool for {params['host']} is full ({self.max_per_host})")
+            # Место под новую сессию резервируем сразу, а подключаемся уже без блокировки
+            slot = Slot(None)
+            slot.busy = True
+            slots.append(slot)
+            self.opened += 1
+            n = self.opened
+        try:
+            slot.b4 = self._open(params, n)
+        except Exception:
+            with self.lock:
+                slots.remove(slot)
+            raise
+        return slot
+
+    def release(self, slot: Slot, healthy: bool = True):
+        if healthy:
+            # Сессию возвращаем в пул только в исходном режиме
+            try:
+                slot.b4.conn.exit_config_mode()
+            except Exception:
+                healthy = False
+        with self.lock:
+            slot.busy = False
+            slot.last_used = time.time()
+        if not healthy:
+            self._drop(slot)
+
+    def _drop(self, slot: Slot):
+        with self.lock:
+            for slots in self.slots.values():
+                if slot in slots:
+                    slots.remove(slot)
+        try:
+            slot.b4.close()
+        except Exception:
+            pass
+
+    def maintain(self):
+        # Фоновая петля: keepalive, выселение простаивающих, подогрев
+        while True:
+            time.sleep(self.keepalive)
+            now = time.time()
+            with self.lock:
+                idle = [(k, s) for k, ss in self.slots.items() for s in ss
+                        if not s.busy and s.b4 is not None]
+                for _, s in idle:
+                    s.busy = True
+            for key, slot in idle:
+                if now - slot.last_used > self.idle_timeout:
+                    self._drop(slot)
+                    continue
+                try:
+                    slot.b4.conn.find_prompt()
+                    ok = True
+                except Exception:
+                    ok = False
+                with self.lock:
+                    slot.busy = False
+                if not ok:
+                    self._drop(slot)
+            self.top_up()
+
+    def top_up(self):
+        # Держим warm готовых сессий на каждый хост, с которым работали
+        # за последние idle_timeout; про остальные забываем, иначе
+        # выселение простаивающих сессий не имело бы смысла.
+        now = time.time()
+        for key, params in list(self.params.items()):
+            if now - self.seen.get(key, now) > self.idle_timeout:
+                with self.lock:
+                    self.params.pop(key, None)
+                    self.seen.pop(key, None)
+                continue
+            with self.lock:
+                free = sum(1 for s in self.slots.get(key, []) if not s.busy)
+            for _ in range(self.warm - free):
+                try:
+                    self.release(self.acquire_new(params))
+                except Exception:
+                    break
+
+    def stats(self) -> dict:
+        with self.lock:
+            return {
+                f"{k[2]}@{k[0]}:{k[1]}": {
+                    "sessions": len(ss),
+                    "busy": sum(1 for s in ss if s.busy),
+                }
+                for k, ss in self.slots.items()
+            }
+
+
+class Handler(socketserver.StreamRequestHandler):
+    def _reply(self, **resp):
+        self.wfile.write((json.dumps(resp) + "\n").encode("utf-8"))
+
+    def handle(self):
+        pool: Pool = self.server.pool
+        slot = None
+        healthy = True
+        try:
+            for line in self.rfile:
+                try:
+                    req = json.loads(line)
+                    op = req.get("op")
+                    if op == "stats":
+                        self._reply(ok=True, result=pool.stats())
+                    elif op == "lease":
+                        if slot is None:
+                            slot = pool.acquire(req["params"])
+                        self._reply(ok=True, result=slot.b4.params["host"])
+                    elif op == "call":
+                        if slot is None:
+                            raise DaemonError("no session leased")
+                        if req["method"] not in ALLOWED:
+                            raise DaemonError(f"method not allowed: {req['method']}")
+                        method = getattr(slot.b4.conn, req["method"])
+                        result = method(*req.get("args", []), **req.get("kwargs", {}))
+                        self._reply(ok=True, result=result)
+                    else:
+                        raise DaemonError(f"unknown op: {op}")
+                except Exception as e:
+                    # Сессию после сбоя (таймаут, обрыв) обратно в пул не кладём
+                    if slot is not None and not isinstance(e, DaemonError):
+                        healthy = False
+                    self._reply(ok=False, error=type(e).__name__, message=str(e))
+        finally:
+            if slot is not None:
+                pool.release(slot, healthy=healthy)
+
+
+class Server(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+def serve(addr: str, out_dir: str = "out_b4", max_per_host: int = 4,
+          idle_timeout: float = 900, keepalive: float = 30, warm: int = 1,
+          prewarm: Optional[List[dict]] = None, b4_opts: Optional[dict] = None):
+    host, port = parse_addr(addr)
+    if not is_loopback(host):
+        # Пароли ходят по сокету открытым текстом — наружу демон не выставляем
+        raise DaemonError(f"DAEMON={addr}: демон слушает только loopback (127.0.0.1 / localhost)")
+    pool = Pool(out_dir, max_per_host, idle_timeout, keepalive, warm, b4_opts)
+    # Сразу подогреваем заданные хосты, чтобы первая задача не ждала SSH
+    for params in prewarm or []:
+        pool.params[pool_key(params)] = params
+        pool.seen[pool_key(params)] = time.time()
+    pool.top_up()
+    threading.Thread(target=pool.maintain, daemon=True).start()
+
+    with Server((host, port), Handler) as srv:
+        srv.pool = pool
+        print(f"b4 daemon on {addr}, warm={warm}, max_per_host={max_per_host}")
+        srv.serve_forever()
+
+
+if __name__ == "__main__":
+    # python b4_daemon.py         — запустить демон для cfg.HOST
+    # python b4_daemon.py stats   — посмотреть пул
+    import b4_cfg as cfg
+
+    addr = cfg.DAEMON or "127.0.0.1:8722"
+    if sys.argv[1:] == ["stats"]:
+        print(json.dumps(stats(addr), indent=2))
+        sys.exit(0)
+
+    serve(
+        addr,
+        out_dir=cfg.OUT_DIR,
+        max_per_host=cfg.DAEMON_MAX_PER_HOST,
+        idle_timeout=cfg.DAEMON_IDLE_TIMEOUT,
+        keepalive=cfg.DAEMON_KEEPALIVE,
+        warm=cfg.DAEMON_WARM,
+        prewarm=[{
+            "host": cfg.HOST, "port": cfg.PORT, "username": cfg.USER,
+            "password": cfg.PASSWORD, "device_type": cfg.DEVICE_TYPE,
+            "global_delay_factor": cfg.GLOBAL_DELAY_FACTOR,
+        }],
+        b4_opts={
+            "session_log_mode": cfg.SESSION_LOG_MODE,
+            "ring_kb": cfg.SESSION_LOG_RING_KB,
+            "emulated": cfg.EMULATED,
+        },
+    )
@@ -0,0 +1,177 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import re
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+
+from b4_runcfg import compress_ids, expand_ids
+
+
+# =========================
+# Дрейф конфигурации
+# =========================
+# После успешного прогона запоминаем, как выглядят секции running-config,
+# которыми управляют скрипты, — по одной на сущность:
+#   vlan <VID> bridge <N>   — строка из vlan database (диапазоны разворачиваются)
+#   interface vlan1.X       — SVI
+#   interface <TRUNK_IF>    — trunk
+#   ip vrf <NAME>
+#   router vrrp <VRID> <IF>
+#   router ospf <PID> [VRF]
+# Для каждой хранится хэш нормализованного тела (пробелы схлопнуты, строки отсортированы)
+# и сами строки — по ним дрейфующую сущность можно вернуть как было.
+# Проверка — один show running-config и сравнение хэшей, без разбора по строкам.
+#
+# Хранится в <out_dir>/drift/<host>.json. Откат (95_rollback) и удаление (90_delete_all)
+# меняют эти сущности намеренно — baseline после них снимается (invalidate), иначе
+# --reapply вернул бы откаченное.
+
+Sections = Dict[str, List[str]]
+
+_VLAN_RE = re.compile(r"^vlan ([\d,\-]+) bridge (\d+)(.*)$")
+# Разрешённые VLAN trunk-а сравниваются по номерам, а не строками (см. _allowed_cmds)
+_ALLOWED_RE = re.compile(r"^switchport trunk allowed vlan add ([\d,\-]+)$")
+
+# Порядок восстановления: сначала то, от чего зависят остальные
+_KIND_ORDER = ("vlan", "vrf", "trunk", "svi", "vrrp", "ospf")
+
+
+def kind(key: str) -> str:
+    if key.startswith("vlan "):
+        return "vlan"
+    if key.startswith("interface vlan1."):
+        return "svi"
+    if key.startswith("interface "):
+        return "trunk"
+    if key.startswith("ip vrf "):
+        return "vrf"
+    return "vrrp" if key.startswith("router vrrp ") else "ospf"
+
+
+def sections(blocks: Dict[str, List[str]], trunk_if: str) -> Sections:
+    # Управляемые секции из parse_blocks(running-config)
+    out: Sections = {}
+    for line in blocks.get("vlan database", []):
+        m = _VLAN_RE.match(line)
+        if not m:
+            continue
+        for vid in expand_ids(m.group(1)):
+            out[f"vlan {vid} bridge {m.group(2)}"] = [f"vlan {vid} bridge {m.group(2)}{m.group(3)}"]
+    for header, body in blocks.items():
+        if (
+            header.startswith(("interface vlan1.", "ip vrf ", "router vrrp ", "router ospf "))
+            or header == f"interface {trunk_if}"
+        ):
+            out[header] = list(body)
+    return out
+
+
+def digest(lines: Sequence[str]) -> str:
+    return hashlib.sha1("\n".join(sorted(lines)).encode("utf-8")).hexdigest()[:16]
+
+
+def path(out_dir: str, host: str) -> Path:
+    return Path(out_dir) / "drift" / f"{host}.json"
+
+
+def save_baseline(out_dir: str, host: str, secs: Sections, run_id: Optional[str] = None):
+    p = path(out_dir, host)
+    p.parent.mkdir(parents=True, exist_ok=True)
+    data = {
+        "stamp": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "run_id": run_id,
+        "sections": {k: {"hash": digest(v), "lines": v} for k, v in secs.items()},
+    }
+    tmp = p.with_suffix(".tmp")
+    tmp.write_text(json.dumps(data, ensure_ascii=False), encoding="utf-8")
+    tmp.replace(p)
+
+
+def load_baseline(out_dir: str, host: str) -> Optional[dict]:
+    try:
+        return json.loads(path(out_dir, host).read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+
+
+def stale_path(out_dir: str, host: str) -> Path:
+    return Path(out_dir) / "drift" / "stale" / f"{host}.json"
+
+
+def invalidate(out_dir: str, host: str, reason: str) -> bool:
+    """
+    Снять baseline хоста: переносим его в drift/stale/<host>.json с причиной.
+    Проверка дрейфа без baseline честно скажет "нет baseline" до следующего
+    успешного прогона или --accept. True — baseline был.
+    """
+    base = load_baseline(out_dir, host)
+    if base is None:
+        return False
+    base["invalidated"] = {"stamp": time.strftime("%Y-%m-%d %H:%M:%S"), "reason": reason}
+    p = stale_path(out_dir, host)
+    p.parent.mkdir(parents=True, exist_ok=True)
+    p.write_text(json.dumps(base, ensure_ascii=False), encoding="utf-8")
+    path(out_dir, host).unlink(missing_ok=True)
+    return True
+
+
+def compare(baseline: dict, secs: Sections) -> Dict[str, List[str]]:
+    # changed — тело отличается, missing — сущность пропала, added — появилась руками
+    base = baseline["sections"]
+    return {
+        "changed": [k for k in base if k in secs and digest(secs[k]) != base[k]["hash"]],
+        "missing": [k for k in base if k not in secs],
+        "added": [k for k in secs if k not in base],
+    }
+
+
+def _negate(line: str) -> str:
+    return line[3:] if line.startswith("no ") else f"no {line}"
+
+
+def _allowed(lines: Sequence[str]) -> set:
+    ids: set = set()
+    for line in lines:
+        m = _ALLOWED_RE.match(line)
+        if m:
+            ids.update(expand_ids(m.group(1)))
+    return ids
+
+
+def _allowed_cmds(have: Sequence[str], want: Sequence[str]) -> List[str]:
+    # Только разница: "remove" лишних и "add" недостающих VLAN. Снять весь список
+    # и добавить заново нельзя — на это время trunk боевого порта остаётся без VLAN.
+    have_ids, want_ids = _allowed(have), _allowed(want)
+    cmds = []
+    if have_ids - want_ids:
+        cmds.append("switchport trunk allowed vlan remove " + ",".join(compress_ids(have_ids - want_ids)))
+    if want_ids - have_ids:
+        cmds.append("switchport trunk allowed vlan add " + ",".join(compress_ids(want_ids - have_ids)))
+    return cmds
+
+
+def repair_cmds(baseline: dict, secs: Sections, keys: Sequence[str]) -> List[str]:
+    """
+    Команды, возвращающие сущности keys к сохранённому виду:
+    лишние строки снимаются ("no ..."), строки из baseline отправляются заново.
+    Разрешённые VLAN trunk-а — только разницей по номерам (remove/add).
+    VLAN — только повтор строки из baseline ("no vlan ..." удалил бы сам VLAN).
+    """
+    base = baseline["sections"]
+    keys = sorted((k for k in keys if k in base), key=lambda k: _KIND_ORDER.index(kind(k)))
+    cmds: List[str] = []
+    vlan_lines = [base[k]["lines"][0] for k in keys if kind(k) == "vlan"]
+    # vlan database идёт одним блоком, остальное — в порядке _KIND_ORDER
+    if vlan_lines:
+        cmds += ["vlan database"] + vlan_lines + ["exit"]
+    for k in keys:
+        if kind(k) == "vlan":
+            continue
+        have = secs.get(k, [])
+        want = [x for x in base[k]["lines"] if not _ALLOWED_RE.match(x)]
+        extra = [x for x in have if x not in want and not _ALLOWED_RE.match(x)]
+        cmds += [k] + [_negate(x) for x in extra] + _allowed_cmds(have, base[k]["lines"]) + want + ["exit"]
+    return cmds
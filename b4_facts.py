@@ -0,0 +1,116 @@
+from __future__ import annotations
+
+import json
+import re
+import time
+from pathlib import Path
+from typing import Optional
+
+
+# =========================
+# Факты и возможности устройства
+# =========================
+# Скрипты написаны под один диалект CLI, а эмулятор ведёт себя иначе,
+# чем живое железо. Здесь мы один раз
+# выясняем, что умеет конкретный хост, и кэшируем это в
+# <out_dir>/facts/<host>.json вместе с версией прошивки:
+#   platform / hardware / firmware — из show version
+#   emulated    — QEMU/KVM/VM: B4 работает с ним в режиме эмулятора (без fast_cli и т.п.)
+#   prompt      — как выглядит промпт
+#   range       — понимает ли "vlan A-B ..." (одна команда вместо тысячи);
+#                 пробуется не при подключении, а по первому запросу config-шага
+#   transaction — есть ли транзакционный режим (cmlsh transaction / commit)
+#   bulk_load   — есть ли "copy file ... running-config"
+# Кэш сбрасывается сам, как только show version показывает другую прошивку
+# (или если прошивку распознать не удалось — "unknown" кэшем не считается).
+
+_FIRMWARE_RE = re.compile(r"^\s*Software version\s*:?\s*(.+?)\s*$", re.I | re.M)
+_VERSION_RE = re.compile(r"^\s*Software Product\s*:\s*(.+?)\s*$", re.I | re.M)
+_HW_RE = re.compile(r"^\s*(?:Hardware Model|Hardware|Platform|Model)\s*:\s*(.+?)\s*$", re.I | re.M)
+_EMU_RE = re.compile(r"qemu|kvm|virtual|\bvm\b|gns3", re.I)
+
+# Ответ парсера CLI "такой команды/аргумента нет" — в отличие от ошибки
+# выполнения ("VLAN not found"), это значит, что синтаксис не поддерживается.
+_SYNTAX_ERR_RE = re.compile(r"invalid input|unrecognized command|%\s*incomplete|\^", re.I)
+
+
+def parse_version(text: str) -> dict:
+    fw = _FIRMWARE_RE.search(text or "")
+    prod = _VERSION_RE.search(text or "")
+    hw = _HW_RE.search(text or "")
+    return {
+        "firmware": fw.group(1) if fw else (prod.group(1) if prod else "unknown"),
+        "platform": prod.group(1).split(",")[0] if prod else "unknown",
+        "hardware": hw.group(1) if hw else "unknown",
+        "emulated": bool(_EMU_RE.search(text or "")),
+    }
+
+
+def cache_path(out_dir: str, host: str) -> Path:
+    return Path(out_dir) / "facts" / f"{host}.json"
+
+
+def load(out_dir: str, host: str) -> Optional[dict]:
+    try:
+        return json.loads(cache_path(out_dir, host).read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+
+
+def save(out_dir: str, host: str, facts: dict):
+    p = cache_path(out_dir, host)
+    p.parent.mkdir(parents=True, exist_ok=True)
+    p.write_text(json.dumps(facts, indent=2, ensure_ascii=False), encoding="utf-8")
+
+
+def range_probe_cmds(bridge: int, vids: tuple) -> list:
+    # То, что набирается в пробе range (для commands.log): "?" в конце —
+    # контекстная подсказка, команда не выполняется
+    a, b = vids
+    return ["configure terminal", "vlan database", f"vlan {a}-{b} bridge {bridge} ?", "end"]
+
+
+def probe_range(conn, bridge: int, vids: tuple) -> Optional[bool]:
+    """
+    Понимает ли устройство диапазон в vlan database.
+    Спрашиваем подсказку "vlan A-B bridge N ?": парсер CLI разбирает диапазон,
+    но ничего не выполняет. Ошибка синтаксиса — диапазонов нет, список
+    вариантов — синтаксис принят, пустой ответ — неизвестно (None).
+    """
+    _, typed, help_cmd, _ = range_probe_cmds(bridge, vids)
+    conn.config_mode()
+    try:
+        conn.send_command_timing(typed, read_timeout=15)
+        out = conn.send_command_timing(help_cmd, strip_command=False, read_timeout=15)
+        conn.send_command_timing("\x15", read_timeout=5)  # Ctrl+U — очистить строку
+    finally:
+        conn.exit_config_mode()
+    out = (out or "").replace(help_cmd, "")
+    if _SYNTAX_ERR_RE.search(out):
+        return False
+    return True if out.strip() else None
+
+
+def probe_bulk_load(conn) -> bool:
+    # Контекстная подсказка "?" выводит варианты, не выполняя команду
+    out = conn.send_command_timing("copy file ?", read_timeout=15)
+    try:
+        conn.send_command_timing("\x15", read_timeout=5)  # Ctrl+U — очистить строку
+    except Exception:
+        pass
+    return "running-config" in (out or "")
+
+
+def probe(conn, version_text: str, transaction_ok: bool) -> dict:
+    facts = parse_version(version_text)
+    facts["prompt"] = conn.find_prompt()
+    facts["transaction"] = transaction_ok
+    # range пробуется позже и только config-шагом (B4.supports) — здесь "ещё не известно"
+    facts["range"] = None
+    facts["range_probed"] = False
+    try:
+        facts["bulk_load"] = probe_bulk_load(conn)
+    except Exception:
+        facts["bulk_load"] = False
+    facts["probed_at"] = time.strftime("%Y-%m-%d %H:%M:%S")
+    return facts
@@ -0,0 +1,280 @@
+from __future__ import annotations
+
+import re
+import sqlite3
+import time
+from pathlib import Path
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+from b4_runcfg import expand_ids
+
+
+# =========================
+# Индекс по логам out_b4
+# =========================
+# За месяцы в out_b4/ копятся тысячи session/commands/errors.log и show *.txt.
+# Искать по ним grep-ом, когда последний раз трогали VLAN 151 или в каких прогонах
+# была конкретная ошибка, — долго. Здесь — инкрементальный индекс в SQLite
+# (<out_dir>/index.sqlite):
+#   files  — какой файл сколько байт уже прочитан (дочитываем только новое)
+#   refs   — упоминания сущностей: vlan / svi (vlan1.X) / vrf / vrid / ospf,
+#            одна строка на (сущность, файл) — первая строка и число упоминаний
+#   errors — строки *_errors.log (вывод, где устройство ругалось, [failed commands] и т.п.)
+#            с заголовком блока, где они встретились;
+#            полнотекстовый поиск по ним через FTS5, если SQLite собран без него — LIKE
+
+_NAME_RE = re.compile(r"^(\d{8}-\d{6})_(.+?)(?:_(session|commands|errors|load))?\.(log|txt)$")
+# Заголовки блоков errors.log: "[2025-01-01 10:00:00] cfg: interface ..." и "[failed commands]"
+_ERR_HDR_RE = re.compile(r"^\[(?:\d{4}-\d\d-\d\d \d\d:\d\d:\d\d\]\s*(.*)|([^\]]*)\])\s*$")
+
+# Один проход regex по строке; имя группы -> вид сущности
+_REF_RE = re.compile(
+    r"\b(?P<svi>vlan1\.\d+)\b"
+    r"|\bvlan (?P<vlan>[\d,\-]+) bridge\b"
+    r"|\ballowed vlan (?:add|remove) (?P<allowed>[\d,\-]+)"
+    r"|\bip vrf (?:forwarding )?(?P<vrf>\S+)"
+    r"|\brouter vrrp (?P<vrid>\d+)\b"
+    r"|\brouter ospf (?P<ospf>\d+)\b(?: (?P<ospf_vrf>\S+))?",
+    re.I,
+)
+_GROUP_KIND = {"svi": "svi", "vlan": "vlan", "allowed": "vlan", "vrf": "vrf",
+               "vrid": "vrid", "ospf": "ospf", "ospf_vrf": "vrf"}
+
+KINDS = ("vlan", "svi", "vrf", "vrid", "ospf")
+
+_READ_CHUNK = 4 * 1024 * 1024
+# Сколько секунд .log не должен меняться, чтобы его недописанный хвост проиндексировать
+_SETTLED_SEC = 60
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    id INTEGER PRIMARY KEY,
+    path TEXT UNIQUE,
+    stamp TEXT, tag TEXT, kind TEXT,
+    offset INTEGER DEFAULT 0,
+    lines INTEGER DEFAULT 0,
+    header TEXT DEFAULT ''
+);
+CREATE TABLE IF NOT EXISTS refs (
+    kind TEXT, value TEXT, file_id INTEGER, line INTEGER, hits INTEGER,
+    PRIMARY KEY (kind, value, file_id)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS errors (
+    id INTEGER PRIMARY KEY,
+    file_id INTEGER, line INTEGER, header TEXT, text TEXT
+);
+CREATE INDEX IF NOT EXISTS errors_file ON errors (file_id);
+"""
+
+
+def db_path(out_dir: str) -> Path:
+    return Path(out_dir) / "index.sqlite"
+
+
+def connect(out_dir: str) -> Tuple[sqlite3.Connection, bool]:
+    # (соединение, есть ли FTS5)
+    p = db_path(out_dir)
+    p.parent.mkdir(parents=True, exist_ok=True)
+    db = sqlite3.connect(str(p))
+    # WAL: запросы не ждут индексатор; NORMAL — без fsync на каждый коммит
+    db.execute("PRAGMA journal_mode=WAL")
+    db.execute("PRAGMA synchronous=NORMAL")
+    db.executescript(_SCHEMA)
+    try:
+        db.execute(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS errors_fts "
+            "USING fts5(text, content='errors', content_rowid='id')"
+        )
+        fts = True
+    except sqlite3.OperationalError:
+        fts = False
+    return db, fts
+
+
+def refs_in(line: str) -> Iterator[Tuple[str, str]]:
+    for m in _REF_RE.finditer(line):
+        for group, val in m.groupdict().items():
+            if val is None:
+                continue
+            kind = _GROUP_KIND[group]
+            if kind == "vlan":
+                try:
+                    ids = expand_ids(val)
+                except ValueError:
+                    continue
+                for vid in ids:
+                    yield kind, str(vid)
+            else:
+                yield kind, val.lower() if kind == "svi" else val
+
+
+def _lines(path: Path, offset: int, final: bool = False) -> Iterator[Tuple[int, str]]:
+    # (смещение после строки, строка) — только полные строки: недописанный хвост дочитаем в следующий раз.
+    # final — файл дописан (см. _complete): последняя строка без "\n" тоже строка.
+    with open(path, "rb") as f:
+        f.seek(offset)
+        tail = b""
+        while True:
+            chunk = f.read(_READ_CHUNK)
+            if not chunk:
+                if final and tail:
+                    yield offset + len(tail), tail.decode("utf-8", errors="replace").rstrip("\r\n")
+                return
+            buf = tail + chunk
+            cut = buf.rfind(b"\n")
+            if cut < 0:
+                tail = buf
+                continue
+            pos = offset
+            for raw in buf[: cut + 1].splitlines(keepends=True):
+                pos += len(raw)
+                yield pos, raw.decode("utf-8", errors="replace").rstrip("\r\n")
+            offset = pos
+            tail = buf[cut + 1:]
+
+
+def _complete(path: Path, mtime: float) -> bool:
+    # *.txt (save_text) пишутся один раз целиком и без "\n" в конце;
+    # *.log дописываются — их хвост считаем строкой, когда файл перестал расти
+    # (если его всё-таки допишут, продолжение строки проиндексируется отдельной строкой)
+    return path.suffix == ".txt" or time.time() - mtime > _SETTLED_SEC
+
+
+def _index_file(db: sqlite3.Connection, fts: bool, path: Path, row) -> int:
+    # Дочитать файл с сохранённого смещения; возвращает, сколько байт прочитано
+    st = path.stat()
+    size = st.st_size
+    if row is None:
+        m = _NAME_RE.match(path.name)
+        stamp, tag = (m.group(1), m.group(2)) if m else ("", path.stem)
+        kind = (m.group(3) or m.group(4)) if m else path.suffix.lstrip(".")
+        cur = db.execute(
+            "INSERT INTO files (path, stamp, tag, kind) VALUES (?, ?, ?, ?)",
+            (str(path), stamp, tag, kind),
+        )
+        row = (cur.lastrowid, 0, 0, "", kind)
+    file_id, offset, line_no, header, kind = row
+
+    if size < offset:
+        # Файл перезаписан — индексируем заново
+        if fts:
+            db.execute(
+                "INSERT INTO errors_fts (errors_fts, rowid, text) "
+                "SELECT 'delete', id, text FROM errors WHERE file_id = ?", (file_id,)
+            )
+        db.execute("DELETE FROM errors WHERE file_id = ?", (file_id,))
+        db.execute("DELETE FROM refs WHERE file_id = ?", (file_id,))
+        offset, line_no, header = 0, 0, ""
+    if size == offset:
+        return 0
+
+    refs = {}
+    errs = []
+    end = offset
+    for end, line in _lines(path, offset, final=_complete(path, st.st_mtime)):
+        line_no += 1
+        for ref in refs_in(line):
+            if ref in refs:
+                refs[ref][1] += 1
+            else:
+                refs[ref] = [line_no, 1]
+        if kind == "errors":
+            m = _ERR_HDR_RE.match(line)
+            if m:
+                header = m.group(1) if m.group(1) is not None else m.group(2)
+            elif line.strip():
+                errs.append((file_id, line_no, header, line.strip()))
+
+    db.executemany(
+        "INSERT INTO refs (kind, value, file_id, line, hits) VALUES (?, ?, ?, ?, ?) "
+        "ON CONFLICT (kind, value, file_id) DO UPDATE SET hits = hits + excluded.hits",
+        # В порядке первичного ключа — вставка в B-дерево идёт подряд, а не вразброс
+        sorted((k, v, file_id, ln, n) for (k, v), (ln, n) in refs.items()),
+    )
+    for e in errs:
+        cur = db.execute("INSERT INTO errors (file_id, line, header, text) VALUES (?, ?, ?, ?)", e)
+        if fts:
+            db.execute("INSERT INTO errors_fts (rowid, text) VALUES (?, ?)", (cur.lastrowid, e[3]))
+    db.execute(
+        "UPDATE files SET offset = ?, lines = ?, header = ? WHERE id = ?",
+        (end, line_no, header, file_id),
+    )
+    return end - offset
+
+
+def _log_files(out_dir: Path) -> Iterable[Path]:
+    # *_session.log.gz (SESSION_LOG_MODE = "gzip") не индексируются: дочитывать сжатый
+    # поток с места нельзя, а распаковывать мегабайты диалога на каждый index — дорого.
+    # Ищите по ним zgrep-ом; commands/errors.log того же прогона индексируются как обычно.
+    for p in out_dir.rglob("*"):
+        if p.suffix in (".log", ".txt") and p.is_file():
+            yield p
+
+
+def update(out_dir: str) -> dict:
+    t0 = time.perf_counter()
+    db, fts = connect(out_dir)
+    known = {
+        r[0]: r[1:]
+        for r in db.execute("SELECT path, id, offset, lines, header, kind FROM files")
+    }
+    files = read = 0
+    for p in _log_files(Path(out_dir)):
+        row = known.get(str(p))
+        if row is not None and p.stat().st_size == row[1]:
+            continue
+        n = _index_file(db, fts, p, row)
+        files += bool(n)
+        read += n
+        # Смещение файла пишется в той же транзакции, что и его строки —
+        # прерванный прогон просто дочитает с последнего коммита
+        if files % 200 == 0:
+            db.commit()
+    db.commit()
+    total = db.execute("SELECT COUNT(*) FROM files").fetchone()[0]
+    db.close()
+    return {"files": files, "bytes": read, "total_files": total, "fts": fts,
+            "seconds": round(time.perf_counter() - t0, 3)}
+
+
+def history(out_dir: str, kind: str, value: str, limit: int = 50,
+            file_kind: Optional[str] = None) -> List[tuple]:
+    # (stamp, tag, вид файла, путь, строка первого упоминания, число упоминаний) — свежие сверху.
+    # file_kind="commands" — только то, что на сущность отправлялось (изменения, а не show)
+    db, _ = connect(out_dir)
+    value = value.lower() if kind == "svi" else value
+    sql = (
+        "SELECT f.stamp, f.tag, f.kind, f.path, r.line, r.hits FROM refs r "
+        "JOIN files f ON f.id = r.file_id WHERE r.kind = ? AND r.value = ?"
+    )
+    args: list = [kind, value]
+    if file_kind:
+        sql += " AND f.kind = ?"
+        args.append(file_kind)
+    sql += " ORDER BY f.stamp DESC, f.path LIMIT ?"
+    rows = db.execute(sql, args + [limit]).fetchall()
+    db.close()
+    return rows
+
+
+def errors(out_dir: str, query: str, limit: int = 50, tag: Optional[str] = None) -> List[tuple]:
+    # (stamp, tag, путь, строка, заголовок блока, текст) — свежие сверху
+    db, fts = connect(out_dir)
+    sql = (
+        "SELECT f.stamp, f.tag, f.path, e.line, e.header, e.text FROM errors e "
+        "JOIN files f ON f.id = e.file_id WHERE "
+    )
+    if fts:
+        # Фраза целиком, чтобы спецсимволы FTS (-, :, *) в запросе не ломали разбор
+        sql += "e.id IN (SELECT rowid FROM errors_fts WHERE errors_fts MATCH ?)"
+        args: list = ['"' + query.replace('"', '""') + '"']
+    else:
+        sql += "e.text LIKE ?"
+        args = [f"%{query}%"]
+    if tag:
+        sql += " AND f.tag LIKE ?"
+        args.append(f"%{tag}%")
+    sql += " ORDER BY f.stamp DESC, e.line LIMIT ?"
+    rows = db.execute(sql, args + [limit]).fetchall()
+    db.close()
+    return rows
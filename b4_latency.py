@@ -0,0 +1,136 @@
+from __future__ import annotations
+
+import json
+import os
+import re
+from pathlib import Path
+from typing import Dict, List, Optional
+
+
+# =========================
+# История задержек CLI по хосту и типу команды
+# =========================
+# Статический READ_TIMEOUT = 300 одинаков для "terminal length 0" и для
+# "show running-config" на 2100 SVI. Зависшая сессия на маленькой команде
+# из-за этого висит 5 минут.
+#
+# Здесь мы запоминаем, сколько реально отвечала каждая команда (и какого
+# размера был ответ), и считаем таймаут из этой истории:
+#   timeout = floor + margin * max(p95(время), p95(сек/единицу) * ожидаемый объём)
+# Единица объёма: для show — байт вывода, для config-пачки — одна команда.
+# Статический таймаут остаётся потолком: больше него не ждём никогда.
+#
+# show running-config (целиком и по секциям) не учим вовсе: её объём зависит
+# от того, что шаги только что создали (снимок после 20-го шага на 2100 SVI
+# в разы больше прошлых), и прошлые замеры тут ничего не говорят — ждём потолок.
+# Если выученный таймаут всё же не хватил, история этого типа сбрасывается,
+# и до новых min_samples замеров команда снова получает потолок.
+
+_NUM_RE = re.compile(r"\d+")
+
+# Типы команд, для которых таймаут всегда — потолок
+_UNLEARNED_RE = re.compile(r"^show running-config\b")
+
+
+def command_kind(cmd: str) -> str:
+    # Тип команды: цифры (VID, VRID, PID, IP) не важны, важна форма.
+    # "show running-config interface vlan1.151" -> "show running-config interface vlanN.N"
+    return _NUM_RE.sub("N", " ".join(cmd.lower().split()))
+
+
+def chunk_kind(cmds) -> str:
+    # Для config-пачки тип определяется первой командой:
+    # пачка SVI и пачка VRRP отвечают очень по-разному.
+    head = next((c for c in cmds if c.strip()), "")
+    return "cfg: " + " ".join(command_kind(head).split()[:2])
+
+
+def _pct(values: List[float], q: float) -> float:
+    vals = sorted(values)
+    return vals[min(len(vals) - 1, int(q * len(vals)))]
+
+
+class LatencyBook:
+    """
+    Персистентная история задержек для одного хоста.
+
+    Файл: <out_dir>/latency/<host>.json, формат {kind: [[seconds, size], ...]}.
+    Храним последние `keep` замеров на тип — этого хватает для перцентилей
+    и файл не разрастается.
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        floor: float = 5.0,
+        margin: float = 3.0,
+        min_samples: int = 5,
+        keep: int = 200,
+    ):
+        self.path = Path(path)
+        self.floor = floor
+        self.margin = margin
+        self.min_samples = min_samples
+        self.keep = keep
+        self.hist: Dict[str, List[List[float]]] = self._load()
+        # Новые замеры этой сессии — при сохранении доливаем только их,
+        # чтобы параллельные сессии к тому же хосту не затирали друг друга.
+        self.fresh: Dict[str, List[List[float]]] = {}
+        # Типы, чья история сброшена после таймаута, — при сохранении убираем их и из файла
+        self.dropped = set()
+
+    def _load(self) -> Dict[str, List[List[float]]]:
+        try:
+            return json.loads(self.path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return {}
+
+    def timeout(self, kind: str, ceiling: float, size_hint: Optional[float] = None) -> float:
+        # Пока истории мало (или это running-config) — честно ждём потолок.
+        if _UNLEARNED_RE.match(kind):
+            return ceiling
+        samples = self.hist.get(kind, [])
+        if len(samples) < self.min_samples:
+            return ceiling
+
+        secs = [s for s, _ in samples]
+        rates = [s / size for s, size in samples if size > 0]
+        expected = max([size for _, size in samples] + [size_hint or 0])
+
+        need = _pct(secs, 0.95)
+        if rates:
+            need = max(need, _pct(rates, 0.95) * expected)
+        return min(ceiling, round(self.floor + self.margin * need, 1))
+
+    def record(self, kind: str, seconds: float, size: float):
+        sample = [round(seconds, 3), size]
+        for store in (self.hist, self.fresh):
+            store.setdefault(kind, []).append(sample)
+            del store[kind][: -self.keep]
+
+    def reset(self, kind: str):
+        # Выученный таймаут не хватил: история этого типа больше не описывает
+        # устройство (вырос конфиг, просело железо). Забываем её — до новых
+        # min_samples замеров команда ждёт потолок.
+        self.hist.pop(kind, None)
+        self.fresh.pop(kind, None)
+        self.dropped.add(kind)
+
+    def save(self):
+        if not self.fresh and not self.dropped:
+            return
+        merged = self._load()
+        for kind in self.dropped:
+            merged.pop(kind, None)
+        for kind, samples in self.fresh.items():
+            merged.setdefault(kind, []).extend(samples)
+            del merged[kind][: -self.keep]
+
+        # Пишем через временный файл — файл истории не должен побиться,
+        # если процесс убьют посреди записи.
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(f".{os.getpid()}.tmp")
+        tmp.write_text(json.dumps(merged), encoding="utf-8")
+        os.replace(tmp, self.path)
+        self.fresh = {}
+        self.dropped = set()
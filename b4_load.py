@@ -0,0 +1,150 @@
+from __future__ import annotations
+
+import re
+import threading
+import time
+from typing import Callable, Optional
+
+
+# =========================
+# Обратная связь по нагрузке устройства
+# =========================
+# CFG_SLEEP и GLOBAL_DELAY_FACTOR подобраны "на худший случай" и вслепую.
+# На массовых удалениях устройство всё равно не успевает переварить поток,
+# а на лёгких пушах мы просто спим зря.
+#
+# Здесь — вторая, лёгкая сессия к тому же устройству, которая раз в interval
+# снимает загрузку CPU, и политика, которая по этой загрузке решает,
+# сколько ждать между пачками:
+#   ниже low       — ускоряемся (пауза уменьшается вдвое, вплоть до 0)
+#   low ... high   — держим текущую паузу
+#   high ... crit  — замедляемся (пауза удваивается, не больше max_sleep)
+#   выше critical  — стоим, пока нагрузка не упадёт ниже high (не дольше max_pause)
+
+# Простой CPU: число перед "id"/"idle" (top: "92.0 id", "87% idle")
+# или после "idle" ("idle 87%", "cpu idle: 90%")
+_IDLE_RE = re.compile(
+    r"(\d+(?:\.\d+)?)\s*%?\s*id(?:le)?\b|\bidle\s*:?\s*(\d+(?:\.\d+)?)\s*%", re.I
+)
+_FIVE_SEC_RE = re.compile(r"five seconds\s*:\s*(\d+(?:\.\d+)?)\s*%", re.I)
+_PCT_RE = re.compile(r"(\d+(?:\.\d+)?)\s*%")
+
+
+def parse_cpu(text: str) -> Optional[float]:
+    """
+    Загрузка CPU в процентах из вывода show.
+    Формат зависит от прошивки, поэтому пробуем по очереди:
+    "... 87.5 id" / "87% idle" / "idle 87%" / "cpu idle: 87%" -> 100 - idle,
+    "CPU utilization for five seconds: 12%" -> 12,
+    иначе — первое число с "%".
+    """
+    if not text:
+        return None
+    m = _IDLE_RE.search(text)
+    if m:
+        return max(0.0, 100.0 - float(m.group(1) or m.group(2)))
+    m = _FIVE_SEC_RE.search(text) or _PCT_RE.search(text)
+    return float(m.group(1)) if m else None
+
+
+class LoadPolicy:
+    def __init__(
+        self,
+        cmd: str = "show process cpu",
+        interval: float = 2.0,
+        low: float = 40.0,
+        high: float = 70.0,
+        critical: float = 90.0,
+        max_sleep: float = 5.0,
+        max_pause: float = 120.0,
+        min_commands: int = 200,
+    ):
+        self.cmd = cmd
+        self.interval = interval
+        self.low = low
+        self.high = high
+        self.critical = critical
+        self.max_sleep = max_sleep
+        self.max_pause = max_pause
+        self.min_commands = min_commands
+        self.cur: Optional[float] = None
+
+    def next_delay(self, load: Optional[float], base: float) -> Optional[float]:
+        # Пауза перед следующей пачкой; None — нагрузка критическая, надо стоять
+        if self.cur is None:
+            self.cur = base
+        if load is None:
+            # Замеров нет (сессия ещё поднимается или show не разобрался) — как без монитора
+            return self.cur
+        if load >= self.critical:
+            return None
+        if load >= self.high:
+            self.cur = min(self.max_sleep, max(self.cur * 2, base, 0.05))
+        elif load < self.low:
+            self.cur = self.cur / 2 if self.cur > 0.01 else 0.0
+        return self.cur
+
+
+class LoadMonitor(threading.Thread):
+    """
+    Фоновый замер загрузки по своей сессии.
+    Сессия открывается внутри потока, чтобы пуш не ждал ещё одного SSH.
+    """
+
+    def __init__(self, open_session: Callable, policy: LoadPolicy):
+        super().__init__(daemon=True)
+        self.open_session = open_session
+        self.policy = policy
+        self.load: Optional[float] = None
+        self.session = None
+        self._stop_evt = threading.Event()
+
+    def run(self):
+        try:
+            self.session = self.open_session()
+        except Exception:
+            return
+        while not self._stop_evt.is_set():
+            try:
+                out = self.session.conn.send_command(
+                    self.policy.cmd,
+                    expect_string=r"#",
+                    read_timeout=max(10, self.policy.interval * 3),
+                )
+                self.load = parse_cpu(out)
+            except Exception:
+                self.load = None
+            self._stop_evt.wait(self.policy.interval)
+
+    def stop(self):
+        self._stop_evt.set()
+        self.join(timeout=self.policy.interval * 3 + 15)
+        if self.session:
+            try:
+                self.session.close()
+            except Exception:
+                pass
+
+
+def pace(monitor: LoadMonitor, policy: LoadPolicy, base: float, log: Callable[[str], None]) -> float:
+    # Сколько спать перед следующей пачкой; при критической нагрузке — ждём здесь же
+    waited = 0.0
+    while True:
+        load = monitor.load
+        before = policy.cur
+        # Уже стоим — продолжаем только когда нагрузка опустилась ниже high
+        holding = waited and load is not None and load >= policy.high
+        delay = None if holding else policy.next_delay(load, base)
+        if delay is not None:
+            if waited:
+                log(f"resume after {waited:.1f}s, cpu {load}%")
+            elif delay != before:
+                log(f"cpu {load}% -> sleep {delay:.2f}s")
+            return delay
+        if waited >= policy.max_pause:
+            log(f"still at cpu {load}% after {waited:.1f}s, continuing slowly")
+            return policy.max_sleep
+        if not waited:
+            log(f"pause: cpu {load}% >= {policy.critical}%")
+        time.sleep(policy.interval)
+        waited += policy.interval
@@ -3,9 +3,16 @@ from __future__ import annotations
 import re
 import time
 from pathlib import Path
-from typing import Sequence, Optional
+from typing import List, Optional, Sequence, Tuple
 
-from netmiko import ConnectHandler
+import b4_chunks
+import b4_facts
+import b4_load
+import b4_rollback
+import b4_sessionlog
+from b4_daemon import DaemonConn, DaemonError
+from b4_latency import LatencyBook, chunk_kind, command_kind
+from b4_runcfg import parse_blocks
 
 
 # =========================
@@ -21,6 +28,10 @@ ERR_RE = re.compile(
 )
 
 
+# Пауза перед повтором упавших команд (сек): временная ошибка — обычно "устройство занято"
+RETRY_PAUSE = 2.0
+
+
 def ts():
     # Короткий timestamp для имен файлов и группирования логов одного запуска
     return time.strftime("%Y%m%d-%H%M%S")
@@ -51,6 +62,24 @@ class B4:
        - commands.log : какие команды мы отправляли
        - errors.log   : фрагменты вывода, где устройство ругалось
     3) заливка конфигурации пачками (per_batch), чтобы можно было лить тысячи команд.
+       Пачки режутся по границам блоков CLI; в пачке с ошибкой упавшие команды
+       находятся по эху в её выводе (find_failed=True) — пачка целиком не повторяется,
+       а только упавшие команды, до retry_failed раз (они ничего не изменили).
+    4) опционально — таймауты, выученные по истории задержек (adaptive_timeout),
+       где переданный read_timeout работает только как потолок.
+    5) журнал изменений для отката (journal=True): snapshot(секции) до заливки,
+       journal(self.applied, inverse) после — см. b4_rollback и 95_rollback_b4.py.
+    6) режим тонкого клиента (daemon="127.0.0.1:8722"): вместо своего SSH берём
+       готовую сессию у b4_daemon.py, если он запущен.
+    7) кэш фактов/возможностей устройства (probe_caps=True, см. b4_facts):
+       по нему выбираются быстрые пути — supports("range") и т.п.
+    8) обратная связь по нагрузке (load_policy, см. b4_load): на больших пушах
+       вторая сессия следит за CPU, и пауза между пачками подстраивается под неё.
+    9) режим session.log (session_log_mode, см. b4_sessionlog): full / gzip /
+       ring (последние ring_kb КБ в памяти, на диск — только при ошибке) / off.
+    10) режим эмулятора (emulated, по умолчанию — из кэша фактов): для "шумной"
+       консоли QEMU/GNS3 — без fast_cli, промпт "#" или ">", без проверки эха,
+       чистка буфера перед пачками и один вход в config-mode на всю заливку.
     """
 
     def __init__(
@@ -64,10 +93,26 @@ class B4:
         global_delay: float = 1.0,
         out_dir: str = "out_b4",
         tag: str = "session",
+        adaptive_timeout: bool = False,
+        timeout_floor: float = 5.0,
+        timeout_margin: float = 3.0,
+        timeout_min_samples: int = 5,
+        journal: bool = False,
+        run_id: Optional[str] = None,
+        find_failed: bool = False,
+        retry_failed: int = 0,
+        daemon: Optional[str] = None,
+        probe_caps: bool = False,
+        probe_bridge: int = 1,
+        probe_vlans: Sequence[int] = (4093, 4094),
+        load_policy: Optional[b4_load.LoadPolicy] = None,
+        session_log_mode: str = "full",
+        ring_kb: int = 256,
+        emulated: Optional[bool] = None,
     ):
         # Параметры Netmiko под реальное железо.
         # fast_cli=True — на реальном устройстве это ускоряет работу,
-        # т.к. CLI работает стабильнее, чем в QEMU/GNS3.
+        # т.к. CLI работает стабильнее, чем в QEMU/GNS3 (там его выключает режим эмулятора).
         self.params = {
             "device_type": device_type,
             "host": host,
@@ -95,14 +140,120 @@ class B4:
 
         self.conn = None
 
+        # Команды последнего cfg(), которые устройство приняло без ошибок
+        self.applied: List[str] = []
+
+        # Журнал отката: все шаги одного run_all пишут в один run_id
+        # (его выставляет run_all через B4_RUN_ID), отдельный запуск шага — в свой.
+        self.journal_enabled = journal
+        self.run_id = run_id or f"{self.stamp}_{self.tag}"
+
+        # Искать упавшие команды пачки по эху и сколько раз повторять только их
+        self.find_failed = find_failed
+        self.retry_failed = retry_failed
+        self.daemon = daemon
+
+        # Факты об устройстве (b4_facts): заполняются при connect, если probe_caps
+        self.probe_caps = probe_caps
+        self.probe_bridge = probe_bridge
+        self.probe_vlans = tuple(probe_vlans)
+        self.facts: Optional[dict] = None
+
+        self.load_policy = load_policy
+
+        self.session_log_mode = session_log_mode
+        self.ring_kb = ring_kb
+
+        # None — решаем по кэшу фактов (b4_facts: emulated из show version)
+        self.emulated = emulated
+        self.ring: Optional[b4_sessionlog.RingLog] = None
+        # Свой объект session_log (gzip/ring): Netmiko закрывает только файлы, открытые им самим
+        self.session_log_obj = None
+        self.load_log = self.out_dir / f"{self.stamp}_{self.tag}_load.log"
+
+        # История задержек по этому хосту — общая для всех шагов и запусков
+        self.latency = None
+        if adaptive_timeout:
+            self.latency = LatencyBook(
+                self.out_dir / "latency" / f"{host}.json",
+                floor=timeout_floor,
+                margin=timeout_margin,
+                min_samples=timeout_min_samples,
+            )
+
+    @classmethod
+    def from_cfg(cls, cfg, tag: str, host: Optional[str] = None) -> "B4":
+        # Собираем B4 из b4_cfg, чтобы шаги не повторяли один и тот же набор аргументов.
+        # host — другой хост с теми же учётками (например, второй коммутатор пары)
+        return cls(
+            host or cfg.HOST, cfg.USER, cfg.PASSWORD, cfg.DEVICE_TYPE, cfg.PORT,
+            global_delay=cfg.GLOBAL_DELAY_FACTOR,
+            out_dir=cfg.OUT_DIR,
+            tag=tag,
+            adaptive_timeout=cfg.ADAPTIVE_TIMEOUT,
+            timeout_floor=cfg.TIMEOUT_FLOOR,
+            timeout_margin=cfg.TIMEOUT_MARGIN,
+            timeout_min_samples=cfg.TIMEOUT_MIN_SAMPLES,
+            journal=cfg.ROLLBACK_JOURNAL,
+            run_id=cfg.RUN_ID or None,
+            find_failed=cfg.CFG_FIND_FAILED,
+            retry_failed=cfg.CFG_RETRY_FAILED,
+            daemon=cfg.DAEMON or None,
+            probe_caps=cfg.PROBE_CAPS,
+            probe_bridge=cfg.BRIDGE_ID,
+            probe_vlans=cfg.PROBE_VLANS,
+            load_policy=b4_load.LoadPolicy(
+                cmd=cfg.LOAD_CMD,
+                interval=cfg.LOAD_INTERVAL,
+                low=cfg.LOAD_LOW,
+                high=cfg.LOAD_HIGH,
+                critical=cfg.LOAD_CRITICAL,
+                max_sleep=cfg.LOAD_MAX_SLEEP,
+                max_pause=cfg.LOAD_MAX_PAUSE,
+                min_commands=cfg.LOAD_MIN_COMMANDS,
+            ) if cfg.LOAD_MONITOR else None,
+            session_log_mode=cfg.SESSION_LOG_MODE,
+            ring_kb=cfg.SESSION_LOG_RING_KB,
+            emulated=cfg.EMULATED,
+        )
+
     def open(self):
         # Для удобства: r = B4(...).open()
         return self.connect()
 
     def connect(self):
-        # Прокидываем session_log в Netmiko
-        self.params["session_log"] = str(self.session_log)
-        self.params["session_log_file_mode"] = "write"
+        # Что уже известно об этом хосте с прошлых запусков
+        cached = b4_facts.load(str(self.out_dir), self.params["host"]) if self.probe_caps else None
+        if self.emulated is None:
+            self.emulated = bool(cached and cached.get("emulated"))
+
+        # Если запущен демон тёплых сессий — берём сессию у него:
+        # она уже подключена и прошла enable/terminal/cmlsh, так что начинаем сразу.
+        # Демон недоступен — спокойно подключаемся сами.
+        if self.daemon:
+            try:
+                self.conn = DaemonConn(self.daemon, dict(self.params))
+                self._load_facts(cached, transaction_ok=None)
+                return self
+            except (OSError, DaemonError) as e:
+                write_text(self.error_log, f"[daemon {self.daemon}] {e}, connecting directly\n", mode="a")
+
+        # Прокидываем session_log в Netmiko: файл, gzip-поток или кольцевой буфер (b4_sessionlog)
+        log, self.ring = b4_sessionlog.make(self.session_log_mode, self.session_log, self.ring_kb)
+        if log is not None:
+            self.params["session_log"] = log
+        if not isinstance(log, str):
+            self.session_log_obj = log
+        if self.session_log_mode == "full":
+            self.params["session_log_file_mode"] = "write"
+
+        # Эмулятор (QEMU/GNS3) "шумит" — там fast_cli только мешает
+        if self.emulated:
+            self.params["fast_cli"] = False
+
+        # Netmiko (и paramiko под ним) импортируем только здесь: офлайн-команды b4.py
+        # и клиент демона не должны платить за его загрузку.
+        from netmiko import ConnectHandler
 
         # Подключаемся с поднятыми таймаутами — на живом железе иногда долгий баннер/SSH
         self.conn = ConnectHandler(
@@ -124,26 +275,81 @@ class B4:
         # Делаем терминал удобным для массовых show:
         # terminal length 0 — чтобы не было пагинации "--More--"
         try:
-            self.conn.send_command("terminal length 0", expect_string=r"#", read_timeout=30)
+            self._send("terminal length 0", 30)
         except Exception:
             pass
 
         # terminal no monitor — чтобы syslog не летел прямо в CLI и не мешал Netmiko
         try:
-            self.conn.send_command("terminal no monitor", expect_string=r"#", read_timeout=30)
+            self._send("terminal no monitor", 30)
         except Exception:
             pass
 
         # B4Com по умолчанию "транзакционный" — без commit команды не применяются.
         # Мы это отключаем на время сессии, чтобы не вставлять commit после каждого шага.
+        transaction_ok = False
         try:
-            self.conn.send_command("cmlsh transaction disable", expect_string=r"#", read_timeout=30)
+            out = self._send("cmlsh transaction disable", 30)
+            transaction_ok = not ERR_RE.search(out or "")
         except Exception as e:
             write_text(self.error_log, f"[cmlsh transaction disable] {e}\n", mode="a")
 
+        # На эмуляторе после всех "разогревов" чистим буфер — меньше шанс таймаута на шуме
+        if self.emulated:
+            self._clear_buffer()
+
+        self._load_facts(cached, transaction_ok)
         return self
 
+    def _load_facts(self, cached: Optional[dict], transaction_ok: Optional[bool]):
+        # show version на каждом подключении дешёвый; полные пробы — только
+        # если хоста ещё нет в кэше или у него сменилась прошивка.
+        if not self.probe_caps:
+            return
+        try:
+            ver = self.show("show version", read_timeout=60)
+            # Первый запуск на эмуляторе (кэша ещё нет): дальше в этой сессии — его режим
+            self.emulated = self.emulated or b4_facts.parse_version(ver)["emulated"]
+            firmware = b4_facts.parse_version(ver)["firmware"]
+            # Нераспознанная прошивка ("unknown") совпала бы с любой другой — это не кэш
+            if cached and firmware != "unknown" and cached.get("firmware") == firmware:
+                self.facts = cached
+                return
+            self.facts = b4_facts.probe(self.conn, ver, transaction_ok)
+            self.facts["host"] = self.params["host"]
+            b4_facts.save(str(self.out_dir), self.params["host"], self.facts)
+        except Exception as e:
+            write_text(self.error_log, f"[facts probe] {e}\n", mode="a")
+
+    def supports(self, name: str, default: bool = False) -> bool:
+        # Возможность из кэша фактов; неизвестно (нет кэша/проба не удалась) — default.
+        # range спрашивают только config-шаги — его проба (вход в config-mode) идёт здесь,
+        # один раз на прошивку, а не при каждом подключении.
+        if name == "range" and self.facts is not None and self.facts.get("range") is None \
+                and not self.facts.get("range_probed"):
+            self._probe_range()
+        value = (self.facts or {}).get(name)
+        return default if value is None else bool(value)
+
+    def _probe_range(self):
+        # Проба — только подсказка "?", ничего не выполняется; что набрали — в commands.log
+        self.facts["range_probed"] = True
+        cmds = b4_facts.range_probe_cmds(self.probe_bridge, self.probe_vlans)
+        write_text(self.cmd_log, "! facts probe: vlan range\n" + "\n".join(cmds) + "\n\n", mode="a")
+        try:
+            self.facts["range"] = b4_facts.probe_range(self.conn, self.probe_bridge, self.probe_vlans)
+            b4_facts.save(str(self.out_dir), self.params["host"], self.facts)
+        except Exception as e:
+            write_text(self.error_log, f"[facts probe] {e}\n", mode="a")
+
     def close(self):
+        # Сохраняем выученные задержки — следующий запуск стартует уже с ними
+        if self.latency:
+            try:
+                self.latency.save()
+            except OSError as e:
+                write_text(self.error_log, f"[latency save] {e}\n", mode="a")
+
         # Корректно закрываем сессию
         if self.conn:
             try:
@@ -151,21 +357,92 @@ class B4:
             finally:
                 self.conn = None
 
-    def _scan_and_log_errors(self, block_title: str, output: str):
+        # gzip дописывает хвост и трейлер только при close — без него файл обрывается
+        if self.session_log_obj is not None:
+            try:
+                self.session_log_obj.close()
+            except OSError as e:
+                write_text(self.error_log, f"[session log close] {e}\n", mode="a")
+            self.session_log_obj = None
+
+    def _scan_and_log_errors(self, block_title: str, output: str) -> bool:
         # Вырезаем из вывода всё, что похоже на ошибку CLI,
         # и складываем это отдельным блоком в errors.log.
+        # True — устройство ругалось.
         if not output:
-            return
+            return False
         m = ERR_RE.findall(output)
         if m:
             hdr = f"[{time.strftime('%Y-%m-%d %H:%M:%S')}] {block_title}\n"
             body = output if len(output) < 10000 else output[-10000:]
             write_text(self.error_log, hdr + body + "\n", mode="a")
+            self._dump_ring(f"error: {block_title}")
+        return bool(m)
+
+    def _dump_ring(self, reason: str):
+        # ring-режим: контекст вокруг ошибки — из памяти в session.log;
+        # gzip-режим: закрываем deflate-блок, чтобы контекст ошибки сразу читался zcat-ом
+        try:
+            if self.ring:
+                self.ring.dump(reason)
+            elif isinstance(self.session_log_obj, b4_sessionlog.GzipLog):
+                self.session_log_obj.sync()
+        except OSError as e:
+            write_text(self.error_log, f"[session log dump] {e}\n", mode="a")
+
+    def _timed(self, kind: str, ceiling: float, call, size_hint: Optional[int] = None):
+        # Обёртка над вызовом Netmiko: берём таймаут из истории (не больше ceiling)
+        # и записываем, сколько команда реально отвечала.
+        if not self.latency:
+            return call(ceiling)
+
+        timeout = self.latency.timeout(kind, ceiling, size_hint)
+        t0 = time.perf_counter()
+        try:
+            out = call(timeout)
+        except Exception as e:
+            # netmiko.exceptions.ReadTimeout или его аналог от демона — по имени,
+            # чтобы не тянуть netmiko ради одного класса
+            if type(e).__name__ != "ReadTimeout":
+                raise
+            self._dump_ring(f"read timeout {timeout}s: {kind}")
+            if timeout < ceiling:
+                # Выученный таймаут не хватил. Исключение всё равно поднимаем —
+                # зависание должно быть видно сразу, — но историю этого типа сбрасываем:
+                # следующий запуск ждёт потолок, пока не наберёт новые замеры.
+                self.latency.reset(kind)
+                write_text(
+                    self.error_log,
+                    f"[learned timeout {timeout}s exceeded, ceiling {ceiling}s, history reset] {kind}\n",
+                    mode="a",
+                )
+            raise
+
+        size = size_hint if size_hint is not None else len(out or "")
+        self.latency.record(kind, time.perf_counter() - t0, size)
+        return out
+
+    def _clear_buffer(self):
+        try:
+            self.conn.clear_buffer()
+        except Exception:
+            pass
+
+    def _send(self, cmd: str, read_timeout: float) -> str:
+        # На эмуляторе промпт бывает и ">", а эхо команды тонет в шуме —
+        # без cmd_verify=False Netmiko там часто ловит ReadTimeout
+        kwargs = {"expect_string": r"[#>]", "cmd_verify": False} if self.emulated else {"expect_string": r"#"}
+        return self._timed(
+            command_kind(cmd),
+            read_timeout,
+            lambda t: self.conn.send_command(cmd, read_timeout=t, **kwargs),
+        )
 
     def show(self, cmd: str, read_timeout: int = 240) -> str:
         # Стандартный show с ожиданием промпта "#".
         # read_timeout берём из cfg, потому что на больших show устройство может отвечать долго.
-        out = self.conn.send_command(cmd, expect_string=r"#", read_timeout=read_timeout)
+        # С adaptive_timeout это только потолок, реальный таймаут — из истории.
+        out = self._send(cmd, read_timeout)
         self._scan_and_log_errors(f"show: {cmd}", out)
         return out
 
@@ -175,43 +452,198 @@ class B4:
         per_batch: int = 50,
         read_timeout: int = 240,
         sleep_between: float = 0.05,
-    ):
+    ) -> List[str]:
         """
         Массовая заливка конфигурации.
 
         Как работает:
-        - режем команды на пачки per_batch
+        - разбираем команды на блоки CLI (interface/router/vlan database/... + их команды)
+          и складываем целые блоки в пачки до per_batch строк (b4_chunks)
         - каждую пачку отправляем send_config_set(...)
         - команды пишем в commands.log
         - всё, где железка ругается, пишем в errors.log
+        - если find_failed включён (или ведётся журнал), в пачке с ошибкой находим
+          конкретные упавшие команды по эху команд в её выводе (b4_chunks.split_result);
+          пачку не повторяем — остальные её команды уже применились, а удаления второй раз
+          сами упадут. Повторяем (retry_failed раз, после паузы) только упавшие команды:
+          они ничего не изменили, и временная ошибка (устройство занято) может пройти
+        - если задан load_policy и команд много — sleep_between только стартовая пауза,
+          дальше она подстраивается под загрузку CPU устройства
+
+        Возвращает команды, которые так и не применились (при find_failed или журнале);
+        то, что применилось, — в self.applied (это и пишется в журнал отката).
         """
-        i = 0
-        while i < len(commands):
-            chunk_cmds = list(commands[i : i + per_batch])
+        retry: List[b4_chunks.Block] = []
+        lost: List[str] = []
+        self.applied = []
+        chunks = b4_chunks.pack(b4_chunks.split_blocks(commands), per_batch)
+        if self.emulated:
+            self._ensure_config_mode()
+        monitor = self._start_load_monitor(len(commands))
+        try:
+            for n, blocks in enumerate(chunks, 1):
+                bad, unknown = self._push(blocks, f"config-chunk {n}", read_timeout)
+                retry += bad
+                lost += unknown
+                if monitor:
+                    time.sleep(b4_load.pace(monitor, self.load_policy, sleep_between, self._log_load))
+                else:
+                    time.sleep(sleep_between)
+        finally:
+            if monitor:
+                monitor.stop()
+
+        # Повтор только упавших команд (с заголовками их блоков)
+        for attempt in range(1, self.retry_failed + 1):
+            if not retry:
+                break
+            time.sleep(RETRY_PAUSE)
+            again: List[b4_chunks.Block] = []
+            for n, blocks in enumerate(b4_chunks.pack(retry, per_batch), 1):
+                bad, unknown = self._push(blocks, f"retry {attempt} chunk {n}", read_timeout)
+                again += bad
+                lost += unknown
+            retry = again
+        failed = lost + [c for c in b4_chunks.render(retry) if c != "exit"]
 
-            # Логируем, что конкретно отправили
-            write_text(self.cmd_log, "\n".join(chunk_cmds) + "\n\n", mode="a")
+        # В конце пробуем выйти из режима конфигурации
+        self._exit_config_mode()
 
-            # Льём конфиг без выхода из config-mode между пачками —
-            # так быстрее и меньше лишних переходов
-            out = self.conn.send_config_set(
+        if failed:
+            write_text(
+                self.error_log,
+                "[failed commands]\n" + "\n".join(failed) + "\n",
+                mode="a",
+            )
+        return failed
+
+    def _exit_config_mode(self):
+        try:
+            self.conn.exit_config_mode()
+        except Exception:
+            if self.emulated:
+                try:
+                    self.conn.send_command("end", expect_string=r"[#>]", cmd_verify=False, read_timeout=30)
+                except Exception:
+                    pass
+
+    def _ensure_config_mode(self):
+        # Эмулятор: входим в config-mode один раз на всю заливку (пачки идут
+        # с enter_config_mode=False). Штатный вход под нагрузкой бывает ловит
+        # таймаут на шуме — тогда просто шлём "configure terminal".
+        self._clear_buffer()
+        try:
+            if not self.conn.check_config_mode():
+                self.conn.config_mode()
+        except Exception:
+            try:
+                self.conn.send_command_timing("configure terminal")
+            except Exception:
+                pass
+
+    def _start_load_monitor(self, n_commands: int) -> Optional[b4_load.LoadMonitor]:
+        # Вторая сессия нужна только на больших пушах — на мелких она дороже самой заливки
+        policy = self.load_policy
+        if not policy or n_commands < policy.min_commands:
+            return None
+        policy.cur = None
+
+        def open_session():
+            # Лёгкая сессия: без журнала, проб и истории таймаутов
+            return B4(
+                self.params["host"], self.params["username"], self.params["password"],
+                self.params["device_type"], self.params["port"],
+                secret=self.params.get("secret"),
+                global_delay=self.params["global_delay_factor"],
+                out_dir=str(self.out_dir),
+                tag=f"{self.tag}_load",
+                daemon=self.daemon,
+                session_log_mode=self.session_log_mode,
+                ring_kb=self.ring_kb,
+                emulated=self.emulated,
+            ).open()
+
+        monitor = b4_load.LoadMonitor(open_session, policy)
+        monitor.start()
+        return monitor
+
+    def _log_load(self, msg: str):
+        write_text(self.load_log, f"[{time.strftime('%Y-%m-%d %H:%M:%S')}] {msg}\n", mode="a")
+
+    def _push(self, blocks, title: str, read_timeout: int) -> Tuple[List[b4_chunks.Block], List[str]]:
+        # Одна пачка целых блоков. Каждый блок сам входит в свой режим
+        # и выходит из него через exit.
+        # Возвращает (упавшие блоки — их можно повторить,
+        #             команды пачки, где ошибку не к чему привязать, — их повторять нельзя)
+        chunk_cmds = b4_chunks.render(blocks)
+        out = self._send_config(chunk_cmds, read_timeout)
+        # С журналом упавшие команды ищем всегда: иначе в applied (и в откат)
+        # попали бы "no ..." для сущностей, которые так и не создались
+        if not self._scan_and_log_errors(title, out) or not (self.find_failed or self.journal_enabled):
+            self.applied += chunk_cmds
+            return [], []
+
+        # Упавшие команды — по эху в выводе (strip_command=False оставляет его)
+        res = b4_chunks.split_result(blocks, out, ERR_RE)
+        if res is None:
+            # Ошибку не к чему привязать — честно считаем упавшей всю пачку
+            # (повторять её нельзя: часть команд уже применилась)
+            return [], [c for c in chunk_cmds if c != "exit"]
+        applied, failed = res
+        # Заголовок без команд, уже применённый раньше (повтор упавшего тела), второй раз не пишем
+        self.applied += b4_chunks.render([b for b in applied if b[1] or b[0] not in self.applied])
+        return failed, []
+
+    def _send_config(self, chunk_cmds: List[str], read_timeout: int) -> str:
+        # Логируем, что конкретно отправили
+        write_text(self.cmd_log, "\n".join(chunk_cmds) + "\n\n", mode="a")
+
+        # Эмулятор: перед каждой пачкой чистим буфер, в config-mode уже вошли в cfg()
+        if self.emulated:
+            self._clear_buffer()
+
+        # Льём конфиг без выхода из config-mode между пачками —
+        # так быстрее и меньше лишних переходов
+        return self._timed(
+            chunk_kind(chunk_cmds),
+            read_timeout,
+            lambda t: self.conn.send_config_set(
                 chunk_cmds,
+                enter_config_mode=not self.emulated,
                 exit_config_mode=False,
-                read_timeout=read_timeout,
+                read_timeout=t,
                 cmd_verify=False,
                 strip_prompt=False,
                 strip_command=False,
-            )
-            self._scan_and_log_errors(f"config-chunk {i // per_batch + 1}", out)
-
-            time.sleep(sleep_between)
-            i += per_batch
+            ),
+            size_hint=len(chunk_cmds),
+        )
 
-        # В конце пробуем выйти из режима конфигурации
-        try:
-            self.conn.exit_config_mode()
-        except Exception:
-            pass
+    def snapshot(self, cmds: Sequence[str] = ("show running-config",), read_timeout: int = 240):
+        # Состояние ДО изменений, разобранное по блокам running-config.
+        # cmds — только нужные шагу секции (b4_plan.snapshot_cmds), а не весь конфиг.
+        # Если прошивка какую-то секцию не понимает — снимаем running-config целиком.
+        # None — журнал выключен, снимать ничего не нужно.
+        if not self.journal_enabled:
+            return None
+        parts = []
+        for cmd in cmds:
+            out = self.show(cmd, read_timeout=read_timeout)
+            if cmd != "show running-config" and ERR_RE.search(out or ""):
+                return parse_blocks(self.show("show running-config", read_timeout=read_timeout))
+            parts.append(out)
+        return parse_blocks("\n".join(parts))
+
+    def journal(self, applied: Sequence[str], inverse: Sequence[str]):
+        # Что применили и как это отменить — в журнал текущего run_id.
+        # Обратные команды для того, что так и не применилось, выкидываем —
+        # иначе откат сам упадёт на "no ..." несуществующего.
+        if not self.journal_enabled:
+            return
+        b4_rollback.record(
+            str(self.out_dir), self.run_id, self.params["host"], self.tag,
+            applied, b4_rollback.prune_inverse(inverse, applied),
+        )
 
     def save_text(self, name: str, text: str):
         # Удобный хелпер для сохранения любых show/verify в отдельный txt
@@ -0,0 +1,68 @@
+from __future__ import annotations
+
+import re
+from collections import Counter
+from typing import List
+
+from b4_runcfg import block_kind, compress_ids, parse_blocks
+
+
+# =========================
+# Разбор сохранённых show
+# =========================
+# Скрипты складывают show в out_b4/*.txt. Здесь — короткая сводка по такому файлу
+# без подключения к устройству ("b4.py parse"):
+#   show vlan brief        — сколько VLAN в каждом bridge и в каком они состоянии
+#   show ip int brief      — сколько интерфейсов up/down и сколько с IP
+#   show running-config    — сколько блоков каждого вида (interface vlan1.N, ip vrf, router ospf ...)
+
+_VLAN_ROW_RE = re.compile(r"^\s*(\d+)\s+(\d+)\s+\S+\s+([A-Za-z]+)\b", re.M)
+_IP_ROW_RE = re.compile(
+    r"^\s*(\S+)\s+(\d+\.\d+\.\d+\.\d+|unassigned)\S*\s+(\S+)\s+(\S+)", re.M
+)
+
+
+def kind(text: str) -> str:
+    if re.search(r"VLAN ID", text):
+        return "vlan brief"
+    if re.search(r"IP-Address", text, re.I):
+        return "ip int brief"
+    return "running-config"
+
+
+def vlan_brief(text: str) -> List[str]:
+    by_bridge: dict = {}
+    states: Counter = Counter()
+    for bridge, vid, state in _VLAN_ROW_RE.findall(text):
+        by_bridge.setdefault(int(bridge), []).append(int(vid))
+        states[state.upper()] += 1
+    out = []
+    for bridge, vids in sorted(by_bridge.items()):
+        ranges = compress_ids(vids)
+        shown = ",".join(ranges[:5]) + (",..." if len(ranges) > 5 else "")
+        out.append(f"bridge {bridge}: {len(vids)} VLAN ({shown})")
+    out += [f"  {state}: {n}" for state, n in sorted(states.items())]
+    return out
+
+
+def ip_int_brief(text: str) -> List[str]:
+    status: Counter = Counter()
+    with_ip = 0
+    for _ifname, ip, st, _proto in _IP_ROW_RE.findall(text):
+        status[st.lower()] += 1
+        with_ip += ip != "unassigned"
+    total = sum(status.values())
+    out = [f"{total} interfaces, {with_ip} with IP"]
+    out += [f"  {st}: {n}" for st, n in sorted(status.items())]
+    return out
+
+
+def running_config(text: str) -> List[str]:
+    kinds = Counter(block_kind(h) for h in parse_blocks(text))
+    return [f"{n:>6}  {k}" for k, n in kinds.most_common()]
+
+
+def summarize(text: str) -> List[str]:
+    k = kind(text)
+    body = {"vlan brief": vlan_brief, "ip int brief": ip_int_brief}.get(k, running_config)(text)
+    return [f"[{k}]"] + body
@@ -0,0 +1,122 @@
+from __future__ import annotations
+
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+
+# =========================
+# Граф зависимостей шагов
+# =========================
+# Порядок 10 → 11 → 20 → 30 → 31 → 35 → 50 → 40 — только одна из допустимых
+# последовательностей. Реальные зависимости такие:
+# - VRF (30) не зависит от VLAN (10)
+# - trunk (11) и SVI (20) нужны только VLAN
+# - bind (31) нужны SVI и VRF
+# - VRRP (35) и OSPF (50) нужен только bind
+# - collect (40) — в самом конце
+# Порядок ключей — это порядок запуска при PIPELINE_SESSIONS = 1 (как было раньше).
+STEPS: Dict[str, List[str]] = {
+    "10_create_vlans_b4.py": [],
+    "11_set_trunk_b4.py": ["10_create_vlans_b4.py"],
+    "20_create_svis_b4.py": ["10_create_vlans_b4.py"],
+    "30_create_vrfs_b4.py": [],
+    "31_bind_svis_to_vrf_b4.py": ["20_create_svis_b4.py", "30_create_vrfs_b4.py"],
+    "35_create_vrrp_b4.py": ["31_bind_svis_to_vrf_b4.py"],
+    "50_create_ospf_b4.py": ["31_bind_svis_to_vrf_b4.py"],
+    "40_collect_outputs_b4.py": [
+        "11_set_trunk_b4.py",
+        "35_create_vrrp_b4.py",
+        "50_create_ospf_b4.py",
+    ],
+}
+
+
+def check_graph(steps: Dict[str, List[str]]):
+    # Ловим опечатки и циклы до того, как что-то полетит на устройство
+    state: Dict[str, int] = {}
+
+    def visit(s: str, path: List[str]):
+        if s not in steps:
+            raise ValueError(f"Неизвестный шаг в зависимостях: {s} (путь {' -> '.join(path)})")
+        if state.get(s) == 1:
+            raise ValueError(f"Цикл в зависимостях: {' -> '.join(path + [s])}")
+        if state.get(s) == 2:
+            return
+        state[s] = 1
+        for d in steps[s]:
+            visit(d, path + [s])
+        state[s] = 2
+
+    for s in steps:
+        visit(s, [])
+
+
+def run_dag(
+    steps: Dict[str, List[str]],
+    sessions: int = 1,
+    log_dir: str = "out_b4",
+    env: Optional[dict] = None,
+    poll: float = 0.2,
+) -> Dict[str, dict]:
+    """
+    Запускает шаги как отдельные процессы, не больше `sessions` одновременно.
+    Каждый шаг открывает свою SSH-сессию к устройству, так что `sessions` —
+    это и есть число параллельных сессий.
+
+    Вывод каждого шага пишется в <log_dir>/<stamp>_pipeline_<шаг>.log.
+    Если шаг упал — новые не запускаем, дожидаемся уже запущенных.
+    Возвращает {шаг: {"rc", "start", "end"}} для всех запущенных шагов.
+    """
+    check_graph(steps)
+    stamp = time.strftime("%Y%m%d-%H%M%S")
+    out = Path(log_dir)
+    out.mkdir(parents=True, exist_ok=True)
+
+    t0 = time.perf_counter()
+    done: Dict[str, dict] = {}
+    running: Dict[str, tuple] = {}
+    failed = False
+
+    while True:
+        # Запускаем всё, у чего зависимости уже успешно отработали
+        if not failed:
+            for s, deps in steps.items():
+                if len(running) >= max(1, sessions):
+                    break
+                if s in done or s in running:
+                    continue
+                if all(d in done and done[d]["rc"] == 0 for d in deps):
+                    log = open(out / f"{stamp}_pipeline_{Path(s).stem}.log", "w", encoding="utf-8")
+                    p = subprocess.Popen(
+                        [sys.executable, s], stdout=log, stderr=subprocess.STDOUT, env=env
+                    )
+                    running[s] = (p, log, time.perf_counter() - t0)
+                    print(f"[{time.perf_counter() - t0:7.1f}s] start {s}")
+
+        if not running:
+            break
+
+        time.sleep(poll)
+        for s, (p, log, start) in list(running.items()):
+            rc = p.poll()
+            if rc is None:
+                continue
+            log.close()
+            del running[s]
+            done[s] = {"rc": rc, "start": start, "end": time.perf_counter() - t0}
+            print(f"[{done[s]['end']:7.1f}s] {'done' if rc == 0 else f'FAIL rc={rc}'} {s}")
+            failed = failed or rc != 0
+
+    return done
+
+
+def summary(done: Dict[str, dict]) -> str:
+    # Сколько заняли шаги по отдельности и сколько занял весь граф
+    if not done:
+        return "nothing was run"
+    total = sum(r["end"] - r["start"] for r in done.values())
+    wall = max(r["end"] for r in done.values())
+    return f"wall {wall:.1f}s, sum of steps {total:.1f}s"
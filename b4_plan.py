@@ -0,0 +1,248 @@
+from __future__ import annotations
+
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import b4_cfg as cfg
+from b4_runcfg import compress_ids
+
+
+# =========================
+# Генераторы команд по cfg
+# =========================
+# Команды каждого шага строятся только из b4_cfg, без устройства.
+# Шаги берут их отсюда, а "b4.py plan" показывает их офлайн.
+# Здесь же — общая IP-схема и имена сущностей, чтобы они не расходились между шагами.
+
+
+def svi_name(vid: int) -> str:
+    return f"vlan1.{vid}"
+
+
+def vrf_name(vid: int) -> str:
+    return f"{cfg.VRF_PREFIX}{vid}"
+
+
+def vlan_ids(count: Optional[int] = None) -> List[int]:
+    n = cfg.VLAN_COUNT if count is None else count
+    return [cfg.VLAN_START + i for i in range(n)]
+
+
+def net_for_idx(idx: int) -> str:
+    # A.(B_START + i//NET_SIZE).(C_START + i%NET_SIZE) — первые три октета сети i
+    b = cfg.IP_BASE_B_START + (idx // cfg.NET_SIZE)
+    c = cfg.IP_BASE_C_START + (idx % cfg.NET_SIZE)
+    return f"{cfg.IP_BASE_A}.{b}.{c}"
+
+
+def ip_for_idx(idx: int, host: int = 1) -> str:
+    return f"{net_for_idx(idx)}.{host}/24"
+
+
+def subnet_for_idx(idx: int) -> str:
+    return f"{net_for_idx(idx)}.0/24"
+
+
+# -------------------------
+# Шаги
+# -------------------------
+
+def vlans_cmds(use_range: bool = False) -> List[str]:
+    # 10: bridge в vlan-режим, vlan database, VLAN-ы (диапазоном, если устройство умеет)
+    ids = vlan_ids()
+    specs = compress_ids(ids) if use_range else [str(v) for v in ids]
+    return (
+        [f"bridge {cfg.BRIDGE_ID} protocol {cfg.BRIDGE_PROTOCOL} vlan-bridge", "vlan database"]
+        + [f"vlan {spec} bridge {cfg.BRIDGE_ID} state enable" for spec in specs]
+        + ["exit"]
+    )
+
+
+def trunk_cmds() -> List[str]:
+    # 11: trunk на TRUNK_IF с диапазоном VLAN из 10-го шага
+    first, last = cfg.VLAN_START, cfg.VLAN_START + cfg.VLAN_COUNT - 1
+    return [
+        f"interface {cfg.TRUNK_IF}",
+        "switchport",
+        f"bridge-group {cfg.BRIDGE_ID}",
+        "switchport mode trunk",
+        f"switchport trunk allowed vlan add {first}-{last}",
+    ]
+
+
+def svis_cmds() -> List[str]:
+    # 20: только поднимаем SVI, IP/VRF — в 31-м шаге
+    cmds = []
+    for vid in vlan_ids(cfg.SVI_COUNT):
+        cmds += [f"interface {svi_name(vid)}", "no shutdown", "exit"]
+    return cmds
+
+
+def vrfs() -> List[str]:
+    return [vrf_name(vid) for vid in vlan_ids(cfg.VRF_COUNT)]
+
+
+def vrfs_cmds() -> List[str]:
+    # 30: VRF 1:1 с первыми VRF_COUNT VLAN
+    return [f"ip vrf {v}" for v in vrfs()]
+
+
+def binds(host: int = 1) -> List[Tuple[str, str, str]]:
+    # (SVI, VRF, IP/len) для 31-го шага
+    return [
+        (svi_name(vid), vrf_name(vid), ip_for_idx(i, host))
+        for i, vid in enumerate(vlan_ids(cfg.VRF_COUNT))
+    ]
+
+
+def bind_cmds(host: int = 1) -> List[str]:
+    # 31: порядок важен — сначала "ip vrf forwarding", потом "ip address",
+    # иначе смена VRF сбросит IP.
+    cmds = []
+    for ifname, vrf, ip in binds(host):
+        cmds += [
+            f"interface {ifname}",
+            f"ip vrf forwarding {vrf}",
+            f"ip address {ip}",
+            "no shutdown",
+            "exit",
+        ]
+    return cmds
+
+
+def vrrp_targets() -> List[Tuple[int, str]]:
+    # (VRID, SVI) для 35-го шага
+    n = min(cfg.VRRP_COUNT, cfg.SVI_COUNT)
+    return [(cfg.VRRP_START_ID + i, svi_name(vid)) for i, vid in enumerate(vlan_ids(n))]
+
+
+def vrrp_cmds(
+    vips: Dict[str, str],
+    priority: Optional[int] = None,
+    priorities: Optional[Dict[int, int]] = None,
+) -> List[str]:
+    # 35: группы только на тех SVI, для которых известен VIP;
+    # priorities — свой приоритет по VRID (HA-пара), остальным — priority
+    prio = cfg.VRRP_PRIORITY if priority is None else priority
+    cmds = []
+    for vrid, ifname in vrrp_targets():
+        if ifname not in vips:
+            continue
+        cmds += [
+            f"router vrrp {vrid} {ifname}",
+            f"virtual-ip {vips[ifname]}",
+            f"priority {(priorities or {}).get(vrid, prio)}",
+            "v2-compatible",
+            "enable",
+            "exit",
+        ]
+    return cmds
+
+
+def planned_vips() -> Dict[str, str]:
+    # VIP, который получится после 31-го шага (адрес SVI) — для офлайн-плана
+    by_if = {ifname: ip.split("/")[0] for ifname, _, ip in binds()}
+    return {ifname: by_if[ifname] for _, ifname in vrrp_targets() if ifname in by_if}
+
+
+def vip_for_idx(idx: int) -> str:
+    return f"{net_for_idx(idx)}.{cfg.VIP_LAST_OCTET}"
+
+
+def pair_vips() -> Dict[str, str]:
+    # Общий VIP HA-пары — .VIP_LAST_OCTET в сети SVI (только у SVI, которые получают IP в 31-м)
+    targets = {ifname for _, ifname in vrrp_targets()}
+    return {ifname: vip_for_idx(i) for i, (ifname, _, _) in enumerate(binds()) if ifname in targets}
+
+
+def pair_priorities(peer: int) -> Dict[int, int]:
+    # peer 0/1 — первый/второй хост пары. Мастер получает VRRP_PRIORITY, backup — VRRP_BACKUP_PRIORITY;
+    # при VRRP_ALTERNATE мастерство чередуется по группам, чтобы трафик шёл через оба коммутатора.
+    out = {}
+    for i, (vrid, _) in enumerate(vrrp_targets()):
+        master = (i % 2 if cfg.VRRP_ALTERNATE else 0) == peer
+        out[vrid] = cfg.VRRP_PRIORITY if master else cfg.VRRP_BACKUP_PRIORITY
+    return out
+
+
+def ospf_procs() -> List[Tuple[int, str, str]]:
+    # (PID, VRF, сеть) — по одному процессу на VRF, сеть по той же схеме, что в 31-м
+    return [
+        (cfg.OSPF_PROCESS_BASE + i, vrf_name(vid), subnet_for_idx(cfg.OSPF_IDX_START + i))
+        for i, vid in enumerate(vlan_ids(cfg.VRF_COUNT))
+    ]
+
+
+def ospf_cmds() -> List[str]:
+    cmds = []
+    for pid, vrf, net in ospf_procs():
+        cmds += [f"router ospf {pid} {vrf}", f"network {net} area 0", "exit"]
+    return cmds
+
+
+def delete_all_cmds(use_range: bool = True) -> List[str]:
+    # 90: OSPF и VRRP (пока живы их VRF и SVI), trunk -> access,
+    # VLAN-ы (SVI уходят вместе с ними), VRF
+    first, last = cfg.VLAN_START, cfg.VLAN_START + cfg.VLAN_COUNT - 1
+    no_ospf = [f"no router ospf {pid} {vrf}" for pid, vrf, _ in ospf_procs()] if cfg.OSPF_ENABLE else []
+    no_vrrp = [f"no router vrrp {vrid} {ifname}" for vrid, ifname in vrrp_targets()]
+    if use_range:
+        no_vlans = [f"no vlan {first}-{last} bridge {cfg.BRIDGE_ID}"]
+    else:
+        no_vlans = [f"no vlan {vid} bridge {cfg.BRIDGE_ID}" for vid in range(first, last + 1)]
+    return (
+        no_ospf
+        + no_vrrp
+        + [
+            f"interface {cfg.TRUNK_IF}",
+            f"switchport trunk allowed vlan remove {first}-{last}",
+            "switchport mode access",
+            "exit",
+        ]
+        + ["vlan database"] + no_vlans + ["exit"]
+        + [f"no ip vrf {v}" for v in vrfs()]
+    )
+
+
+# Шаг -> секции running-config, из которых считаются его обратные команды
+# (снимок "до" для журнала отката). Весь running-config на большом коробе —
+# мегабайты, а шагу нужна одна-две секции.
+_SNAPSHOT = {
+    "10": ["show running-config bridge", "show running-config vlan"],
+    "11": [f"show running-config interface {cfg.TRUNK_IF}"],
+    "20": ["show running-config interface"],
+    "30": ["show running-config vrf"],
+    "31": ["show running-config interface"],
+    "35": ["show running-config vrrp"],
+    "50": ["show running-config ospf"],
+}
+
+
+def snapshot_cmds(*steps: str) -> List[str]:
+    # Секции для набора шагов без повторов; "interface X" не нужен, если снимаются все интерфейсы
+    out: List[str] = []
+    for step in steps:
+        for c in _SNAPSHOT[step]:
+            if c not in out:
+                out.append(c)
+    return [c for c in out if not any(c != o and c.startswith(o + " ") for o in out)]
+
+
+# Шаг -> команды для офлайн-плана ("b4.py plan")
+PLANS = {
+    "10": lambda: vlans_cmds(),
+    "11": trunk_cmds,
+    "20": svis_cmds,
+    "30": vrfs_cmds,
+    "31": bind_cmds,
+    "35": lambda: vrrp_cmds(planned_vips()),
+    "50": lambda: ospf_cmds() if cfg.OSPF_ENABLE else [],
+    "90": lambda: delete_all_cmds(),
+}
+
+
+def render(steps: Sequence[str]) -> List[str]:
+    out = []
+    for s in steps:
+        out.append(f"! ---- {s} ----")
+        out += PLANS[s]()
+    return out
@@ -0,0 +1,213 @@
+from __future__ import annotations
+
+import json
+import re
+import time
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from b4_chunks import CONTEXT_RE, render, split_blocks
+from b4_runcfg import compress_ids, expand_ids, vlan_ids
+
+
+# =========================
+# Журнал изменений и обратные команды
+# =========================
+# Каждый config-шаг перед заливкой снимает нужные ему секции running-config,
+# а после — пишет в журнал запуска:
+#   applied — что устройство реально приняло (отправленное минус упавшее)
+#   inverse — минимальный набор команд, который возвращает то, что было ДО шага
+#             (без "no ..." для того, что шаг так и не создал — prune_inverse)
+# Журнал: <out_dir>/runs/<run_id>/journal.jsonl (строка на шаг).
+# 95_rollback_b4.py берёт записи запуска в обратном порядке и льёт inverse.
+#
+# Принцип для всех inverse_*: трогаем только то, чего до шага не было
+# (или что шаг поменял). Всё, что существовало раньше, остаётся как было.
+
+Blocks = Dict[str, List[str]]
+
+
+def runs_dir(out_dir: str) -> Path:
+    return Path(out_dir) / "runs"
+
+
+def record(out_dir: str, run_id: str, host: str, tag: str,
+           applied: Sequence[str], inverse: Sequence[str]):
+    path = runs_dir(out_dir) / run_id / "journal.jsonl"
+    path.parent.mkdir(parents=True, exist_ok=True)
+    entry = {
+        "ts": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "host": host,
+        "tag": tag,
+        "applied": list(applied),
+        "inverse": list(inverse),
+    }
+    # Одна строка на запись, append — шаги из параллельного run_all пишут в тот же файл
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+
+
+def load(out_dir: str, run_id: str, host: Optional[str] = None) -> List[dict]:
+    path = runs_dir(out_dir) / run_id / "journal.jsonl"
+    entries = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                entries.append(json.loads(line))
+    return [e for e in entries if host is None or e["host"] == host]
+
+
+def latest_run(out_dir: str) -> Optional[str]:
+    # run_id начинается с timestamp, поэтому последний по имени — самый свежий
+    runs = sorted(p.parent.name for p in runs_dir(out_dir).glob("*/journal.jsonl"))
+    return runs[-1] if runs else None
+
+
+def plan(entries: Iterable[dict]) -> List[str]:
+    """
+    Команды отката всего запуска: inverse шагов в обратном порядке.
+    Журнал пишется по завершении шага, поэтому обратный порядок записей —
+    это и обратный порядок зависимостей (OSPF/VRRP → bind → SVI/VRF → VLAN).
+    Одинаковые "no ..." из разных шагов (например, no interface от 31 и 20) не повторяем,
+    а блоки, возвращающие прежний вид сущности, которую откат всё равно удаляет
+    (interface vlan1.X от 31-го при "no interface vlan1.X" от 20-го), не отправляем.
+    """
+    blocks = []
+    seen = set()
+    for e in reversed(list(entries)):
+        for hdr, body in split_blocks(e["inverse"]):
+            # Повторы ищем только среди команд верхнего уровня: "no ip vrf forwarding"
+            # внутри блоков разных интерфейсов — разные команды
+            if hdr is None:
+                if body[0] in seen:
+                    continue
+                seen.add(body[0])
+            blocks.append((hdr, body))
+    deleted = {body[0][3:] for hdr, body in blocks if hdr is None and body[0].startswith("no ")}
+    return render([b for b in blocks if b[0] is None or b[0] not in deleted])
+
+
+_VLAN_RE = re.compile(r"^vlan ([\d,\-]+) bridge (\d+)")
+
+
+def prune_inverse(inverse: Sequence[str], applied: Sequence[str]) -> List[str]:
+    """
+    Убираем из inverse удаление того, что шаг так и не создал:
+    "no <заголовок>" — только для заголовков из applied,
+    "no vlan ..." — только для VLAN, которые есть в applied.
+    Иначе откат сам упадёт на несуществующем, и его не получится довести до конца.
+    """
+    made = set(applied)
+    vids: Dict[str, set] = {}
+    for c in applied:
+        m = _VLAN_RE.match(c)
+        if m:
+            vids.setdefault(m.group(2), set()).update(expand_ids(m.group(1)))
+
+    out: List[str] = []
+    for c in inverse:
+        if c.startswith("no "):
+            m = _VLAN_RE.match(c[3:])
+            if m:
+                keep = [v for v in expand_ids(m.group(1)) if v in vids.get(m.group(2), ())]
+                out += [f"no vlan {r} bridge {m.group(2)}" for r in compress_ids(keep)]
+                continue
+            if CONTEXT_RE.match(c[3:]) and c[3:] not in made:
+                continue
+        out.append(c)
+    # Блок, из которого всё выкинули (vlan database без VLAN), не нужен
+    return render([b for b in split_blocks(out) if b[0] is None or b[1]])
+
+
+# -------------------------
+# Обратные команды по шагам
+# -------------------------
+
+def inverse_vlans(pre: Blocks, vids: Iterable[int], bridge: int) -> List[str]:
+    had = vlan_ids(pre, bridge)
+    new = [v for v in vids if v not in had]
+    cmds = []
+    if new:
+        cmds += ["vlan database"]
+        cmds += [f"no vlan {r} bridge {bridge}" for r in compress_ids(new)]
+        cmds += ["exit"]
+    # bridge убираем, только если его создал именно этот шаг
+    if not any(h.startswith(f"bridge {bridge} ") for h in pre):
+        cmds.append(f"no bridge {bridge}")
+    return cmds
+
+
+def inverse_trunk(pre: Blocks, ifname: str, bridge: int, vids: Iterable[int]) -> List[str]:
+    body = pre.get(f"interface {ifname}", [])
+    allowed = set()
+    for line in body:
+        if line.startswith("switchport trunk allowed vlan add "):
+            allowed.update(expand_ids(line.rsplit(" ", 1)[1]))
+
+    cmds = [f"switchport trunk allowed vlan remove {r}"
+            for r in compress_ids(v for v in vids if v not in allowed)]
+    if "switchport mode trunk" not in body:
+        cmds.append("switchport mode access")
+    if f"bridge-group {bridge}" not in body:
+        cmds.append(f"no bridge-group {bridge}")
+    if "switchport" not in body:
+        cmds.append("no switchport")
+    return [f"interface {ifname}"] + cmds + ["exit"] if cmds else []
+
+
+def inverse_svis(pre: Blocks, ifnames: Iterable[str]) -> List[str]:
+    return [f"no interface {i}" for i in ifnames if f"interface {i}" not in pre]
+
+
+def inverse_vrfs(pre: Blocks, vrfs: Iterable[str]) -> List[str]:
+    return [f"no ip vrf {v}" for v in vrfs if f"ip vrf {v}" not in pre]
+
+
+def inverse_bind(pre: Blocks, binds: Iterable[Tuple[str, str, str]]) -> List[str]:
+    # binds: (ifname, vrf, ip/len) — как их применил 31-й шаг
+    cmds = []
+    for ifname, vrf, ip in binds:
+        if f"interface {ifname}" not in pre:
+            cmds.append(f"no interface {ifname}")
+            continue
+        body = pre[f"interface {ifname}"]
+        old_vrf = next((l.split()[-1] for l in body if l.startswith("ip vrf forwarding ")), None)
+        old_ips = [l for l in body if l.startswith("ip address ")]
+
+        sub = []
+        if old_vrf != vrf:
+            # Смена VRF сбрасывает IP — после неё IP возвращаем заново
+            sub.append(f"ip vrf forwarding {old_vrf}" if old_vrf else "no ip vrf forwarding")
+            sub += old_ips
+        elif f"ip address {ip}" not in old_ips:
+            sub.append(f"no ip address {ip}")
+            sub += old_ips
+        if "shutdown" in body:
+            sub.append("shutdown")
+        if sub:
+            cmds += [f"interface {ifname}"] + sub + ["exit"]
+    return cmds
+
+
+def inverse_vrrp(pre: Blocks, groups: Iterable[Tuple[int, str]]) -> List[str]:
+    cmds = []
+    for vrid, ifname in groups:
+        hdr = f"router vrrp {vrid} {ifname}"
+        if hdr not in pre:
+            cmds.append(f"no {hdr}")
+        else:
+            # Группа была и раньше — возвращаем её прежние параметры
+            cmds += [hdr] + pre[hdr] + ["exit"]
+    return cmds
+
+
+def inverse_ospf(pre: Blocks, procs: Iterable[Tuple[int, str, str]]) -> List[str]:
+    # procs: (pid, vrf, network)
+    cmds = []
+    for pid, vrf, net in procs:
+        hdr = f"router ospf {pid} {vrf}"
+        if hdr not in pre:
+            cmds.append(f"no {hdr}")
+        elif f"network {net} area 0" not in pre[hdr]:
+            cmds += [hdr, f"no network {net} area 0", "exit"]
+    return cmds
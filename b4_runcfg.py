@@ -0,0 +1,97 @@
+from __future__ import annotations
+
+import re
+from typing import Dict, Iterable, List, Set, Tuple
+
+
+# =========================
+# Разбор show running-config
+# =========================
+# В OcNOS running-config устроен просто:
+#   строка без отступа      — заголовок блока (interface ..., router ..., ip vrf ...)
+#   строки с отступом       — тело этого блока
+#   "!"                     — разделитель
+# Этого хватает, чтобы сравнивать состояние "до/после" по сущностям.
+
+
+def parse_blocks(text: str) -> Dict[str, List[str]]:
+    """{заголовок: [строки тела]}; пробелы внутри строк нормализуются."""
+    blocks: Dict[str, List[str]] = {}
+    body = None
+    for raw in (text or "").splitlines():
+        line = raw.rstrip()
+        if not line.strip() or line.strip() == "!":
+            continue
+        norm = " ".join(line.split())
+        if line[0] in (" ", "\t"):
+            if body is not None:
+                body.append(norm)
+            continue
+        # Эхо команды и промпт (switch#...) — это не конфиг
+        if norm.startswith("show ") or re.match(r"^\S+[#>]", norm):
+            body = None
+            continue
+        body = blocks.setdefault(norm, [])
+    return blocks
+
+
+def expand_ids(spec: str) -> List[int]:
+    # "151-153,160" -> [151, 152, 153, 160]
+    out = []
+    for part in spec.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        if "-" in part:
+            a, b = part.split("-", 1)
+            out.extend(range(int(a), int(b) + 1))
+        else:
+            out.append(int(part))
+    return out
+
+
+def compress_ids(ids: Iterable[int]) -> List[str]:
+    # [151, 152, 153, 160] -> ["151-153", "160"]
+    out = []
+    for v in sorted(set(ids)):
+        if out and out[-1][1] == v - 1:
+            out[-1][1] = v
+        else:
+            out.append([v, v])
+    return [f"{a}-{b}" if a != b else f"{a}" for a, b in out]
+
+
+_VLAN_RE = re.compile(r"^vlan ([\d,\-]+) bridge (\d+)")
+
+
+def vlan_ids(blocks: Dict[str, List[str]], bridge: int) -> Set[int]:
+    # VLAN-ы bridge-а из блока "vlan database" (устройство может свернуть их в диапазоны)
+    out: Set[int] = set()
+    for line in blocks.get("vlan database", []):
+        m = _VLAN_RE.match(line)
+        if m and int(m.group(2)) == bridge:
+            out.update(expand_ids(m.group(1)))
+    return out
+
+
+def block_kind(header: str) -> str:
+    # "interface vlan1.151" -> "interface vlan1.N", "router ospf 3 VRF_151" -> "router ospf"
+    words = header.split()
+    if words[0] == "interface" and len(words) > 1:
+        return "interface " + re.sub(r"\d+$", "N", words[1])
+    return " ".join(words[:2])
+
+
+def diff_blocks(
+    a: Dict[str, List[str]], b: Dict[str, List[str]]
+) -> Tuple[List[str], List[str], Dict[str, Tuple[List[str], List[str]]]]:
+    # (только в b, только в a, {заголовок: (строки только в b, строки только в a)})
+    added = [h for h in b if h not in a]
+    removed = [h for h in a if h not in b]
+    changed = {}
+    for h in a:
+        if h in b and a[h] != b[h]:
+            plus = [x for x in b[h] if x not in a[h]]
+            minus = [x for x in a[h] if x not in b[h]]
+            changed[h] = (plus, minus)
+    return added, removed, changed
@@ -0,0 +1,153 @@
+from __future__ import annotations
+
+import gzip
+import io
+import sys
+import time
+import weakref
+import zlib
+from pathlib import Path
+from typing import Optional, Tuple, Union
+
+
+# =========================
+# Режимы session.log
+# =========================
+# Netmiko пишет в session_log каждый кусок диалога и сразу делает flush.
+# На пуше 2100 сущностей и многомегабайтных show это синхронная запись
+# несжатого файла прямо в горячем цикле — а читают его только когда что-то сломалось.
+#   full — как раньше: <stamp>_<tag>_session.log целиком
+#   gzip — то же, но потоком в <stamp>_<tag>_session.log.gz
+#   ring — в памяти последние N КБ; на диск (в session.log) только когда
+#          устройство ругнулось или скрипт упал — контекст вокруг ошибки
+#   off  — без session.log
+#
+# Netmiko принимает в session_log открытый io.BufferedIOBase и пишет в него байты —
+# через это и подключаются gzip и кольцевой буфер.
+
+MODES = ("full", "gzip", "ring", "off")
+
+# Живые кольцевые буферы — чтобы сбросить их, если скрипт падает с исключением
+_rings: "weakref.WeakSet[RingLog]" = weakref.WeakSet()
+_prev_hook = None
+
+
+class GzipLog(io.BufferedIOBase):
+    """
+    Потоковая запись session.log в gzip.
+    flush() от Netmiko (после каждого куска) пропускаем: gzip на каждый flush
+    закрывает deflate-блок — сжатие и скорость падают в разы. Вместо этого полный
+    deflate-блок закрывается раз в sync_bytes несжатых байт: всё, что до него,
+    уже читается zcat-ом, даже если скрипт упал и close() так и не случился.
+    """
+
+    def __init__(self, path: Path, level: int = 1, sync_bytes: int = 1024 * 1024):
+        # Уровень 1: вдвое быстрее 6-го, а повторяющийся CLI-вывод всё равно сжимается в сотни раз
+        super().__init__()
+        self.gz = gzip.open(path, "wb", compresslevel=level)
+        self.sync_bytes = sync_bytes
+        self.pending = 0   # сколько байт записано с последнего закрытого блока
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, b) -> int:
+        n = self.gz.write(b)
+        self.pending += n
+        if self.pending >= self.sync_bytes:
+            self.sync()
+        return n
+
+    def sync(self):
+        # Z_FULL_FLUSH: блок закрыт и сброшен в файл, словарь сброшен —
+        # читать можно с любой такой границы
+        if not self.closed and self.pending:
+            self.gz.flush(zlib.Z_FULL_FLUSH)
+            self.pending = 0
+
+    def flush(self):
+        pass
+
+    def close(self):
+        if not self.closed:
+            self.gz.close()
+        super().close()
+
+
+class RingLog(io.BufferedIOBase):
+    """
+    Последние size байт диалога в памяти. dump() дописывает в path то,
+    что накопилось с прошлого сброса (но не больше size), с заголовком-причиной.
+    """
+
+    def __init__(self, path: Path, size: int):
+        super().__init__()
+        self.path = Path(path)
+        self.size = size
+        self.buf = bytearray()
+        self.total = 0     # сколько байт всего прошло через буфер
+        self.dumped = 0    # до какой позиции (от начала сессии) уже сброшено на диск
+        _rings.add(self)
+        _install_hook()
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, b) -> int:
+        self.buf += b
+        self.total += len(b)
+        # Обрезаем не на каждой записи, а когда буфер вырос вдвое — иначе memmove на каждый кусок
+        if len(self.buf) > 2 * self.size:
+            del self.buf[: len(self.buf) - self.size]
+        return len(b)
+
+    def flush(self):
+        pass
+
+    def close(self):
+        # Netmiko закрывает лог при disconnect — данные оставляем, вдруг ещё понадобится dump()
+        super().close()
+
+    def dump(self, reason: str):
+        start = max(self.dumped, self.total - min(len(self.buf), self.size))
+        if start >= self.total:
+            return
+        data = bytes(self.buf[len(self.buf) - (self.total - start):])
+        skipped = start - self.dumped
+        hdr = f"\n===== [{time.strftime('%Y-%m-%d %H:%M:%S')}] {reason}"
+        hdr += f" (skipped {skipped} bytes) =====\n" if skipped else " =====\n"
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.path, "ab") as f:
+            f.write(hdr.encode("utf-8") + data)
+        self.dumped = self.total
+
+
+def _excepthook(exc_type, exc, tb):
+    for ring in list(_rings):
+        try:
+            ring.dump(f"unhandled {exc_type.__name__}: {exc}")
+        except OSError:
+            pass
+    _prev_hook(exc_type, exc, tb)
+
+
+def _install_hook():
+    global _prev_hook
+    if _prev_hook is None:
+        _prev_hook = sys.excepthook
+        sys.excepthook = _excepthook
+
+
+def make(mode: str, path: Path, ring_kb: int = 256) -> Tuple[Optional[Union[str, io.BufferedIOBase]], Optional[RingLog]]:
+    # (значение для session_log в Netmiko или None, кольцевой буфер или None)
+    if mode not in MODES:
+        raise ValueError(f"SESSION_LOG_MODE={mode!r}, ожидается одно из {MODES}")
+    if mode == "full":
+        return str(path), None
+    if mode == "gzip":
+        path.parent.mkdir(parents=True, exist_ok=True)
+        return GzipLog(path.with_name(path.name + ".gz")), None
+    if mode == "ring":
+        ring = RingLog(path, ring_kb * 1024)
+        return ring, ring
+    return None, None
@@ -1,18 +1,26 @@
-import subprocess, sys, time
+import os
+import sys
+import time
 
-steps = [
-  "10_create_vlans_b4.py",
-  "11_set_trunk_b4.py",
-  "20_create_svis_b4.py",
-  "30_create_vrfs_b4.py",
-  "31_bind_svis_to_vrf_b4.py",
-  "35_create_vrrp_b4.py",
-  "50_create_ospf_b4.py",
-  "40_collect_outputs_b4.py",
-]
+import b4_cfg as cfg
+from b4_pipeline import STEPS, run_dag, summary
 
-for s in steps:
-    subprocess.run([sys.executable, s], check=True)
-    time.sleep(0.5)
+# Шаги идут по графу зависимостей из b4_pipeline.STEPS:
+# независимые шаги (например, VLAN и VRF) идут параллельно
+# в PIPELINE_SESSIONS отдельных SSH-сессиях к одному устройству.
+# PIPELINE_SESSIONS = 1 — старый последовательный прогон.
+#
+# Все шаги пишут журнал отката под одним run_id —
+# откатить весь прогон: python 95_rollback_b4.py <run_id>
+run_id = cfg.RUN_ID or f"{time.strftime('%Y%m%d-%H%M%S')}_run_all"
+env = dict(os.environ, B4_RUN_ID=run_id)
+print(f"run_id: {run_id}")
+
+done = run_dag(STEPS, sessions=cfg.PIPELINE_SESSIONS, log_dir=cfg.OUT_DIR, env=env)
+print(summary(done))
+
+if len(done) != len(STEPS) or any(r["rc"] != 0 for r in done.values()):
+    print("FAIL")
+    sys.exit(1)
 
 print("OK")
@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# Модули b4_* лежат в корне репозитория рядом со скриптами шагов
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
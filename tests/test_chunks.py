@@ -0,0 +1,86 @@
+from b4_chunks import pack, render, split_blocks, split_result
+from b4_netmiko import ERR_RE
+
+
+def test_split_blocks_groups_commands_under_their_mode():
+    cmds = [
+        "bridge 1 protocol rstp vlan-bridge",
+        "interface vlan1.151", "ip address 10.0.0.1/24", "exit",
+        "ip vrf A", "no ip vrf B",  # верхнеуровневая команда закрывает незакрытый блок
+        "vlan database", "vlan 151 bridge 1", "end",
+    ]
+    assert split_blocks(cmds) == [
+        (None, ["bridge 1 protocol rstp vlan-bridge"]),
+        ("interface vlan1.151", ["ip address 10.0.0.1/24"]),
+        ("ip vrf A", []),
+        (None, ["no ip vrf B"]),
+        ("vlan database", ["vlan 151 bridge 1"]),
+    ]
+
+
+def test_ip_vrf_forwarding_stays_in_interface_block():
+    blocks = split_blocks(["interface vlan1.151", "ip vrf forwarding A", "exit"])
+    assert blocks == [("interface vlan1.151", ["ip vrf forwarding A"])]
+
+
+def test_pack_never_splits_a_block_across_chunks():
+    blocks = [(f"interface vlan1.{i}", ["ip address x", "no shutdown"]) for i in range(5)]
+    chunks = pack(blocks, 10)
+    assert [len(c) for c in chunks] == [2, 2, 1]
+    assert all(len(render(c)) <= 10 for c in chunks)
+    assert [b for c in chunks for b in c] == blocks
+
+
+def test_pack_cuts_oversized_block_with_header_on_each_piece():
+    body = [f"vlan {v} bridge 1" for v in range(100, 112)]
+    chunks = pack([("vlan database", body)], 6)
+    assert all(len(c) == 1 and c[0][0] == "vlan database" for c in chunks)
+    assert [len(c[0][1]) for c in chunks] == [4, 4, 4]
+    assert [cmd for c in chunks for cmd in c[0][1]] == body
+
+
+def _echo(blocks, errors):
+    # Вывод send_config_set(strip_command=False): эхо каждой команды после промпта,
+    # после команд из errors — строка ошибки
+    out = []
+    for cmd in render(blocks):
+        out.append(f"switch(config)#{cmd}")
+        if cmd in errors:
+            out.append(errors[cmd])
+    return "\n".join(out)
+
+
+def test_split_result_attributes_error_to_echoed_command():
+    blocks = [("ip vrf A", []), ("interface vlan1.151", ["ip vrf forwarding A", "ip address x"])]
+    out = _echo(blocks, {"ip address x": "% Invalid input detected"})
+    applied, failed = split_result(blocks, out, ERR_RE)
+    assert failed == [("interface vlan1.151", ["ip address x"])]
+    assert applied == [("ip vrf A", []), ("interface vlan1.151", ["ip vrf forwarding A"])]
+
+
+def test_split_result_failed_header_fails_whole_block():
+    blocks = [("router vrrp 1 vlan1.999", ["virtual-ip 10.0.0.254"]), (None, ["no ip vrf B"])]
+    out = _echo(blocks, {"router vrrp 1 vlan1.999": "% Interface not found"})
+    applied, failed = split_result(blocks, out, ERR_RE)
+    assert failed == [("router vrrp 1 vlan1.999", ["virtual-ip 10.0.0.254"])]
+    assert applied == [(None, ["no ip vrf B"])]
+
+
+def test_split_result_survives_lost_echo():
+    blocks = [("vlan database", ["no vlan 151 bridge 1", "no vlan 152 bridge 1", "no vlan 153 bridge 1"])]
+    out = "\n".join([
+        "switch(config)#vlan database",
+        "switch(config-vlan)#no vlan 151 bridge 1",
+        # эхо 152 потерялось в шуме консоли
+        "switch(config-vlan)#no vlan 153 bridge 1",
+        "% VLAN not found",
+        "switch(config-vlan)#exit",
+    ])
+    applied, failed = split_result(blocks, out, ERR_RE)
+    assert failed == [("vlan database", ["no vlan 153 bridge 1"])]
+    assert applied == [("vlan database", ["no vlan 151 bridge 1", "no vlan 152 bridge 1"])]
+
+
+def test_split_result_unattributable_error():
+    blocks = [("ip vrf A", [])]
+    assert split_result(blocks, "% Resource busy\nswitch(config)#ip vrf A", ERR_RE) is None
@@ -0,0 +1,32 @@
+import b4_drift as drift
+
+TRUNK = "interface eth1"
+
+
+def _base(secs):
+    return {"sections": {k: {"hash": drift.digest(v), "lines": v} for k, v in secs.items()}}
+
+
+def test_trunk_repair_sends_only_allowed_vlan_difference():
+    base = _base({TRUNK: ["switchport mode trunk", "switchport trunk allowed vlan add 151-160"]})
+    secs = {TRUNK: ["switchport mode trunk", "switchport trunk allowed vlan add 151-154,156-160"]}
+    cmds = drift.repair_cmds(base, secs, [TRUNK])
+    assert cmds == [TRUNK, "switchport trunk allowed vlan add 155", "switchport mode trunk", "exit"]
+
+
+def test_trunk_repair_removes_extra_vlans():
+    base = _base({TRUNK: ["switchport trunk allowed vlan add 151-153"]})
+    secs = {TRUNK: ["switchport trunk allowed vlan add 151-153,200"]}
+    cmds = drift.repair_cmds(base, secs, [TRUNK])
+    assert cmds == [TRUNK, "switchport trunk allowed vlan remove 200", "exit"]
+
+
+def test_repair_negates_extra_lines_and_orders_by_kind():
+    key = "interface vlan1.151"
+    base = _base({key: ["ip address 10.10.10.1/24"], "vlan 151 bridge 1": ["vlan 151 bridge 1 state enable"]})
+    secs = {key: ["ip address 10.10.10.1/24", "shutdown"]}
+    cmds = drift.repair_cmds(base, secs, [key, "vlan 151 bridge 1"])
+    assert cmds == [
+        "vlan database", "vlan 151 bridge 1 state enable", "exit",
+        key, "no shutdown", "ip address 10.10.10.1/24", "exit",
+    ]
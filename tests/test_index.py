@@ -0,0 +1,38 @@
+import os
+import time
+
+import b4_index
+
+
+def _write(path, text, age=0):
+    path.write_bytes(text.encode("utf-8"))
+    if age:
+        t = time.time() - age
+        os.utime(path, (t, t))
+
+
+def test_txt_without_trailing_newline_indexes_last_line(tmp_path):
+    # save_text пишет без "\n" в конце — последняя строка тоже должна искаться
+    _write(tmp_path / "20250101-100000_35_vrrp_plan.txt", "router vrrp 1 vlan1.151\nrouter vrrp 2 vlan1.152")
+    _write(tmp_path / "20250101-100000_50_ospf_verify.txt", "router ospf 7 VRF7")
+    b4_index.update(str(tmp_path))
+
+    assert b4_index.history(str(tmp_path), "svi", "vlan1.152")
+    assert b4_index.history(str(tmp_path), "ospf", "7")
+    assert b4_index.history(str(tmp_path), "vrf", "VRF7")
+
+    # Повторный update ничего не дочитывает: смещение — конец файла
+    assert b4_index.update(str(tmp_path))["bytes"] == 0
+
+
+def test_growing_log_tail_waits_until_settled(tmp_path):
+    log = tmp_path / "20250101-100000_10_create_vlans_commands.log"
+    _write(log, "vlan database\nvlan 151 bridge 1")
+    b4_index.update(str(tmp_path))
+    assert not b4_index.history(str(tmp_path), "vlan", "151")
+
+    # Строку дописали, и файл больше не растёт — хвост без "\n" тоже индексируется
+    _write(log, "vlan database\nvlan 151 bridge 1\nvlan 152 bridge 1", age=3600)
+    b4_index.update(str(tmp_path))
+    assert b4_index.history(str(tmp_path), "vlan", "151")
+    assert b4_index.history(str(tmp_path), "vlan", "152")
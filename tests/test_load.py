@@ -0,0 +1,21 @@
+import pytest
+
+from b4_load import parse_cpu
+
+
+@pytest.mark.parametrize("text, load", [
+    ("%Cpu(s):  5.0 us,  2.5 sy,  0.0 ni, 87.5 id,  0.0 wa", 12.5),
+    ("CPU: 13% busy, 87% idle", 13.0),
+    ("idle 87%", 13.0),
+    ("cpu idle: 90%", 10.0),
+    ("CPU Idle : 95.5%", 4.5),
+    ("CPU utilization for five seconds: 12%/0%; one minute: 10%; five minutes: 9%", 12.0),
+    ("Total CPU load 33%", 33.0),
+])
+def test_parse_cpu_formats(text, load):
+    assert parse_cpu(text) == pytest.approx(load)
+
+
+@pytest.mark.parametrize("text", ["", None, "no numbers here"])
+def test_parse_cpu_unknown(text):
+    assert parse_cpu(text) is None
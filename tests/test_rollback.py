@@ -0,0 +1,39 @@
+import b4_rollback as rb
+
+
+def test_prune_inverse_keeps_only_what_the_step_created():
+    applied = [
+        "vlan database", "vlan 151-153 bridge 1 state enable", "exit",
+        "interface vlan1.151", "exit",
+    ]
+    inverse = [
+        "vlan database", "no vlan 151-155 bridge 1", "exit",
+        "no interface vlan1.151", "no interface vlan1.152",
+    ]
+    assert rb.prune_inverse(inverse, applied) == [
+        "vlan database", "no vlan 151-153 bridge 1", "exit",
+        "no interface vlan1.151",
+    ]
+
+
+def test_prune_inverse_drops_emptied_vlan_database():
+    inverse = ["vlan database", "no vlan 4000 bridge 1", "exit", "no ip vrf A"]
+    assert rb.prune_inverse(inverse, ["ip vrf A", "exit"]) == ["no ip vrf A"]
+
+
+def test_plan_reverses_steps_and_skips_restores_of_deleted_entities():
+    entries = [
+        {"tag": "20", "inverse": ["no interface vlan1.151", "no interface vlan1.152"]},
+        {"tag": "31", "inverse": [
+            "interface vlan1.151", "no ip vrf forwarding A", "exit",
+            "interface vlan1.160", "no ip vrf forwarding A", "exit",
+            "no interface vlan1.152",
+        ]},
+    ]
+    assert rb.plan(entries) == [
+        # Тело SVI, который откат всё равно удалит, не восстанавливаем;
+        # одинаковые команды внутри разных блоков — не повторы
+        "interface vlan1.160", "no ip vrf forwarding A", "exit",
+        "no interface vlan1.152",
+        "no interface vlan1.151",
+    ]